@@ -29,6 +29,7 @@ while keeping the core timing and handshake behaviour intact.
 
 from __future__ import annotations
 
+import functools
 import pathlib
 from typing import Literal
 
@@ -36,11 +37,13 @@ from typing import Literal
 ProtocolName = Literal["ahb", "apb"]
 
 
+@functools.lru_cache(maxsize=1)
 def get_library_root() -> pathlib.Path:
-    """Return the root directory of the Bus Protocol Library."""
+    """Return the root directory of the Bus Protocol Library (resolved once)."""
     return pathlib.Path(__file__).resolve().parent
 
 
+@functools.lru_cache(maxsize=None)
 def get_skeleton_dir(protocol: ProtocolName) -> pathlib.Path:
     """
     Return the directory containing skeletons for a given protocol.
@@ -0,0 +1,492 @@
+# @File    : agent_gen_common.py
+# @desc    : Shared LLM client, response cache and output writers for the agent file generators.
+
+import os
+import argparse
+import asyncio
+import hashlib
+import pathlib
+import re
+import shutil
+import textwrap
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# NOTE: API key string has been sanitised for open-source release.
+os.environ["OPENAI_API_BASE"] = "api base"
+os.environ["OPENAI_API_KEY"] = "api key"
+
+model = "gpt-4.1"
+
+SV_BLOCK_PATTERN = re.compile(r'```systemverilog([\s\S]+?)```', re.IGNORECASE)
+CLASS_HEAD_PATTERN = re.compile(r'class (\w+)')
+SV_OPEN_FENCE_PATTERN = re.compile(r'```systemverilog', re.IGNORECASE)
+# Batched answers tag each fence with the item it belongs to.
+NAMED_SV_BLOCK_PATTERN = re.compile(r'```systemverilog(?:[ \t]+name=(\S+))?\s*([\s\S]+?)```', re.IGNORECASE)
+# Fence names stop at whitespace, so item names are sent with it replaced.
+WHITESPACE_RUN_PATTERN = re.compile(r'\s+')
+
+# Batch mode (-req_dir): cap on in-flight LLM requests and retry policy.
+DEFAULT_CONCURRENCY = 8
+MAX_RETRIES = 3
+RETRY_BASE_DELAY = 1.0
+
+# Upper bound on threads used to write the per-class .sv files.
+CLASS_WRITE_WORKERS = 8
+# Header prepended to every per-class .sv file.
+UVM_IMPORT_PREFIX = b'import uvm_pkg::*;\n\n'
+
+# One pooled session for every LLM call so TCP/TLS connections are reused.
+# Batch mode grows the pool to -concurrency; retries live in get_request_async.
+HTTP_POOL_SIZE = DEFAULT_CONCURRENCY
+HTTP_TIMEOUT = (5, 120)  # (connect, read) seconds
+_session = None
+_session_pool_size = 0
+_session_lock = threading.Lock()
+
+# Appended to a generator's SYSTEM_PREFIX when several modules share one request (-batch_size).
+BATCH_INSTRUCTIONS = """
+Batch mode: instead of a single REQUIREMENTS section, the ITEMS section lists several modules,
+each with a name and its own requirements file. Apply the steps above to every item independently,
+using the shared TEMPLATE and INTERFACE sections, and output the complete code for each item in its
+own fenced block opened with ```systemverilog name=<item name>.
+"""
+
+
+def get_session(pool_size=HTTP_POOL_SIZE):
+    """Return the shared HTTP session, importing ``requests`` on first use.
+
+    The import is deferred so that -h, argument errors and cache hits do not
+    pay for loading requests/urllib3/ssl. The adapters keep at least
+    `pool_size` connections per host; asking for a larger pool than the
+    session has remounts them.
+    """
+    global _session, _session_pool_size
+    with _session_lock:
+        if _session is None:
+            import requests
+
+            _session = requests.Session()
+        if pool_size > _session_pool_size:
+            from requests.adapters import HTTPAdapter
+
+            _session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=pool_size))
+            _session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=pool_size))
+            _session_pool_size = pool_size
+        return _session
+
+
+def get_request(prompt, temperature=0.2, max_new_tokens=4096, model=model, system=None,
+                session=None):
+    """Placeholder for the actual LLM HTTP request.
+
+    You need to fill in:
+      - the URL of your model endpoint
+      - request payload / headers
+      - how to parse the response and return the generated text
+
+    Issue the call through `session` (default: `get_session()`), e.g.
+    ``session.post(url, json=payload, headers=headers, timeout=HTTP_TIMEOUT)``,
+    rather than ``requests.post`` so connections are reused across calls.
+
+    When `system` is given, send it as a separate system-role message if
+    the API supports one (so the provider can cache it), otherwise prepend
+    it to `prompt`.
+    """
+    raise NotImplementedError("Fill this function with your own HTTP call.")
+
+
+def get_request_stream(prompt, temperature=0.2, max_new_tokens=4096, model=model, system=None,
+                       session=None):
+    """Placeholder for a streaming variant of `get_request`.
+
+    Same parameters as `get_request`, but yields the generated text in
+    chunks as they arrive (e.g. ``stream=True`` on an SSE endpoint), so
+    class files can be written before generation finishes.
+    """
+    raise NotImplementedError("Fill this function with your own streaming HTTP call.")
+
+
+async def get_request_async(semaphore, prompt, pool_size=HTTP_POOL_SIZE, **kwargs):
+    """Run `get_request` in a worker thread, bounded by `semaphore`.
+
+    The call goes through the shared session with room for `pool_size`
+    connections, which should match the semaphore's bound. Network failures
+    (``requests`` exceptions derive from ``OSError``) are retried with
+    exponential backoff; anything else propagates immediately.
+    """
+    async with semaphore:
+        session = await asyncio.to_thread(get_session, pool_size)
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                return await asyncio.to_thread(get_request, prompt, session=session, **kwargs)
+            except OSError:
+                if attempt == MAX_RETRIES:
+                    raise
+                await asyncio.sleep(RETRY_BASE_DELAY * 2 ** attempt)
+
+
+def cache_key(system, prompt, model=model):
+    """Return the response-cache key for one request: its system message, prompt and model."""
+    payload = "\x00".join((system, prompt, model))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def load_cached_answer(cache_dir, key):
+    """Return the answer cached under `cache_dir` for `key`, or None on a cache miss."""
+    cache_path = os.path.join(cache_dir, f'{key}.md')
+    if not os.path.exists(cache_path):
+        return None
+    with open(cache_path, 'r', encoding='utf-8') as cf:
+        return cf.read()
+
+
+def store_cached_answer(cache_dir, key, answer):
+    """Write `answer` through to the response cache under `cache_dir`."""
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(os.path.join(cache_dir, f'{key}.md'), 'w', encoding='utf-8') as cf:
+        cf.write(answer)
+
+
+def store_cached_answer_file(cache_dir, key, answer_file_name):
+    """Copy an answer already saved on disk into the response cache under `cache_dir`."""
+    os.makedirs(cache_dir, exist_ok=True)
+    shutil.copyfile(answer_file_name, os.path.join(cache_dir, f'{key}.md'))
+
+
+def build_prompt(req_content, temp_content, interface_content):
+    """Build the user prompt that accompanies the generator's SYSTEM_PREFIX.
+
+    Sections are ordered from most to least stable (template, interface,
+    requirements) so the leading bytes stay identical across modules and
+    remain eligible for the provider's prompt cache.
+    """
+    return (
+        f"<<<TEMPLATE>>>\n{temp_content}\n<<<END TEMPLATE>>>\n\n"
+        f"<<<INTERFACE>>>\n{interface_content}\n<<<END INTERFACE>>>\n\n"
+        f"<<<REQUIREMENTS>>>\n{req_content}\n<<<END REQUIREMENTS>>>\n"
+    )
+
+
+def batch_item_name(name):
+    """Return the name `name` is sent and fenced under in a batch prompt."""
+    return WHITESPACE_RUN_PATTERN.sub('_', name.strip())
+
+
+def build_batch_prompt(items, temp_content, interface_content):
+    """Build one prompt covering several ``(name, req_content)`` items.
+
+    The template and interface are sent once; only the ITEMS section grows
+    with the batch. Items are listed under batch_item_name(name), which must
+    be unique within the batch.
+    """
+    item_parts = []
+    seen = {}
+    for name, req_content in items:
+        item_name = batch_item_name(name)
+        if item_name in seen:
+            raise ValueError(
+                f"requirements files '{seen[item_name]}' and '{name}' both map to batch item "
+                f"name '{item_name}'; rename one of them or use -batch_size 1"
+            )
+        seen[item_name] = name
+        item_parts.append(f"- name: {item_name}\n  req: |\n")
+        item_parts.append(textwrap.indent(req_content.rstrip("\n") + "\n", "    "))
+    items_block = "".join(item_parts)
+    return (
+        f"<<<TEMPLATE>>>\n{temp_content}\n<<<END TEMPLATE>>>\n\n"
+        f"<<<INTERFACE>>>\n{interface_content}\n<<<END INTERFACE>>>\n\n"
+        f"<<<ITEMS>>>\n{items_block}<<<END ITEMS>>>\n"
+    )
+
+
+def write_agent_files(answer, answer_file_name, output_file_name, agent_output_dir):
+    """Save the raw answer, then split its SystemVerilog blocks into per-class files."""
+    with open(answer_file_name, "w", encoding='utf-8') as wf:
+        wf.write(answer)
+
+    write_agent_blocks(SV_BLOCK_PATTERN.findall(answer), output_file_name, agent_output_dir)
+
+
+def write_agent_blocks(content, output_file_name, agent_output_dir):
+    """Combine code blocks into `output_file_name`, then split it into per-class files."""
+    if content:
+        with open(output_file_name, 'w', encoding='utf-8') as output_file:
+            output_file.write("\n\n".join(code_block.strip() for code_block in content))
+
+        with open(output_file_name, 'r', encoding='utf-8') as f:
+            agent_content = f.read()
+
+        write_agent_classes(agent_content, agent_output_dir)
+
+        # Remove the original combined agent file once split
+        os.remove(output_file_name)
+
+
+def split_classes(content):
+    """Yield ``(name, text)`` for every ``class <name> ... endclass : <name>``.
+
+    Each class head is paired with its literal ``endclass : <name>`` via
+    str.find, so the content is scanned once instead of backtracking a
+    regex backreference from every head.
+    """
+    pos = 0
+    while True:
+        head = CLASS_HEAD_PATTERN.search(content, pos)
+        if head is None:
+            return
+        class_name = head.group(1)
+        tail = f'endclass : {class_name}'
+        end = content.find(tail, head.end())
+        if end == -1:
+            pos = head.start() + 1
+            continue
+        end += len(tail)
+        yield class_name, content[head.start():end]
+        pos = end
+
+
+def write_agent_classes(agent_content, agent_output_dir):
+    """Write every ``class ... endclass : <name>`` in the content to ``<name>.sv``."""
+    out_dir = pathlib.Path(agent_output_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    # Keyed by path so a repeated class name still ends with the last definition.
+    class_files = {}
+    for class_name, class_content in split_classes(agent_content):
+        class_files[out_dir / f'{class_name}.sv'] = UVM_IMPORT_PREFIX + class_content.encode('utf-8')
+
+    if len(class_files) < 2:
+        for path, data in class_files.items():
+            path.write_bytes(data)
+        return
+
+    with ThreadPoolExecutor(max_workers=min(CLASS_WRITE_WORKERS, len(class_files))) as executor:
+        list(executor.map(pathlib.Path.write_bytes, class_files.keys(), class_files.values()))
+
+
+class SVBlockStreamParser:
+    """Incrementally extract ```systemverilog fenced blocks from streamed text.
+
+    Matches what SV_BLOCK_PATTERN finds on the full answer, but hands each
+    block back as soon as its closing fence arrives.
+    """
+
+    CLOSE_FENCE = "```"
+
+    def __init__(self):
+        self.in_code = False
+        self._buf = ""
+        self._scan_from = 1
+
+    def feed(self, chunk):
+        """Consume `chunk` and return the list of blocks it completed."""
+        self._buf += chunk
+        blocks = []
+        while True:
+            if not self.in_code:
+                match = SV_OPEN_FENCE_PATTERN.search(self._buf)
+                if match is None:
+                    # Keep just enough text to recognise a fence split across chunks.
+                    self._buf = self._buf[-(len("```systemverilog") - 1):]
+                    return blocks
+                self._buf = self._buf[match.end():]
+                self.in_code = True
+                self._scan_from = 1
+
+            # A block needs at least one character before its closing fence.
+            end = self._buf.find(self.CLOSE_FENCE, self._scan_from)
+            if end == -1:
+                self._scan_from = max(1, len(self._buf) - len(self.CLOSE_FENCE) + 1)
+                return blocks
+            blocks.append(self._buf[:end])
+            self._buf = self._buf[end + len(self.CLOSE_FENCE):]
+            self.in_code = False
+
+
+def stream_agent_files(chunks, answer_file_name, output_file_name, agent_output_dir, echo=False):
+    """Streaming counterpart of `write_agent_files`.
+
+    The raw answer goes straight to `answer_file_name` and each code block's
+    classes are written as soon as the block's closing fence is received.
+    """
+    parser = SVBlockStreamParser()
+    output_file = None
+
+    with open(answer_file_name, "w", encoding='utf-8') as wf:
+        for chunk in chunks:
+            wf.write(chunk)
+            if echo:
+                print(chunk, end="", flush=True)
+
+            for code_block in parser.feed(chunk):
+                if output_file is None:
+                    output_file = open(output_file_name, 'w', encoding='utf-8')
+                else:
+                    output_file.write("\n\n")
+                code_block = code_block.strip()
+                output_file.write(code_block)
+                write_agent_classes(code_block, agent_output_dir)
+
+    if output_file is not None:
+        output_file.close()
+        # Remove the combined agent file once every block has been split
+        os.remove(output_file_name)
+
+
+async def request_with_cache(semaphore, key, prompt, system, cache_dir, pool_size=HTTP_POOL_SIZE):
+    """Return the answer cached for `key`, or request it and write it through.
+
+    Caching is skipped entirely when `cache_dir` is None.
+    """
+    answer = load_cached_answer(cache_dir, key) if cache_dir else None
+    if answer is None:
+        answer = await get_request_async(semaphore, prompt, pool_size=pool_size, system=system)
+        if cache_dir:
+            store_cached_answer(cache_dir, key, answer)
+    return answer
+
+
+async def process_req_dir(req_files, temp_content, interface_content, output_root, concurrency,
+                          system, cache_dir=None, batch_size=1):
+    """Generate one agent per requirements file, issuing the LLM calls concurrently.
+
+    `system` is the generator's SYSTEM_PREFIX; answers are cached under
+    `cache_dir` unless it is None. With ``batch_size > 1`` up to that many
+    requirements files share a single request (see build_batch_prompt).
+    Outputs for ``<name>.md`` are written under ``<output_root>/<name>/``.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    def read_req(req_path):
+        name = os.path.splitext(os.path.basename(req_path))[0]
+        with open(req_path, 'r', encoding='utf-8') as reqf:
+            return name, reqf.read()
+
+    async def process_one(req_path):
+        name, req_content = read_req(req_path)
+        prompt = build_prompt(req_content, temp_content, interface_content)
+        answer = await request_with_cache(
+            semaphore,
+            cache_key(system, prompt),
+            prompt,
+            system,
+            cache_dir,
+            pool_size=concurrency,
+        )
+
+        agent_output_dir = os.path.join(output_root, name)
+        os.makedirs(agent_output_dir, exist_ok=True)
+        write_agent_files(
+            answer,
+            os.path.join(agent_output_dir, "answer1.md"),
+            os.path.join(agent_output_dir, f"{name}_agent_file.sv"),
+            agent_output_dir,
+        )
+
+    async def process_batch(batch_idx, batch_files):
+        items = [read_req(req_path) for req_path in batch_files]
+        prompt = build_batch_prompt(items, temp_content, interface_content)
+        batch_system = system + BATCH_INSTRUCTIONS
+        answer = await request_with_cache(
+            semaphore,
+            cache_key(batch_system, prompt),
+            prompt,
+            batch_system,
+            cache_dir,
+            pool_size=concurrency,
+        )
+
+        os.makedirs(output_root, exist_ok=True)
+        with open(os.path.join(output_root, f"batch{batch_idx}_answer.md"), "w", encoding='utf-8') as wf:
+            wf.write(answer)
+
+        blocks = {batch_item_name(name): [] for name, _ in items}
+        for match in NAMED_SV_BLOCK_PATTERN.finditer(answer):
+            if match.group(1) in blocks:
+                blocks[match.group(1)].append(match.group(2))
+
+        for name, _ in items:
+            content = blocks[batch_item_name(name)]
+            if not content:
+                print(f"[warn] no code block returned for '{name}' in batch {batch_idx}")
+                continue
+            agent_output_dir = os.path.join(output_root, name)
+            os.makedirs(agent_output_dir, exist_ok=True)
+            write_agent_blocks(
+                content,
+                os.path.join(agent_output_dir, f"{name}_agent_file.sv"),
+                agent_output_dir,
+            )
+
+    if batch_size > 1:
+        batches = [req_files[k:k + batch_size] for k in range(0, len(req_files), batch_size)]
+        await asyncio.gather(*(process_batch(idx, batch) for idx, batch in enumerate(batches)))
+    else:
+        await asyncio.gather(*(process_one(req_path) for req_path in req_files))
+
+
+def positive_int(value):
+    """argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f'expected an integer >= 1, got {value}')
+    return number
+
+
+def build_arg_parser(protocol, cache_dir):
+    """Return the command-line parser shared by the generators for `protocol` (e.g. 'AHB')."""
+    parser = argparse.ArgumentParser(description=f'{protocol} File Generator (skeleton)')
+    parser.add_argument(
+        '-req',
+        default='./PATH_TO_REQ_FILE.md',
+        type=str,
+        help='Path to requirements/specification file (placeholder)'
+    )
+    parser.add_argument(
+        '-req_dir',
+        default=None,
+        type=str,
+        help='Directory of requirements files (*.md); generates one agent per file concurrently'
+    )
+    parser.add_argument(
+        '-temp',
+        default=f'./PATH_TO_{protocol}_TEMPLATE.sv',
+        type=str,
+        help=f'Path to {protocol} template skeleton (placeholder)'
+    )
+    parser.add_argument(
+        '-interface',
+        default='./PATH_TO_INTERFACE_FILE.sv',
+        type=str,
+        help='Path to interface description file (placeholder)'
+    )
+    parser.add_argument(
+        '-output_dir',
+        default='./PATH_TO_AGENT_OUTPUT_DIR',
+        type=str,
+        help='Root output directory for -req_dir mode (placeholder)'
+    )
+    parser.add_argument(
+        '-concurrency',
+        default=DEFAULT_CONCURRENCY,
+        type=positive_int,
+        help='Maximum number of concurrent LLM requests in -req_dir mode'
+    )
+    parser.add_argument(
+        '-no_cache',
+        action='store_true',
+        help=f'Always call the LLM instead of reusing answers cached under {cache_dir}'
+    )
+    parser.add_argument(
+        '-batch_size',
+        default=1,
+        type=positive_int,
+        help='In -req_dir mode, number of requirements files sent in a single LLM request'
+    )
+    parser.add_argument(
+        '-stream',
+        action='store_true',
+        help='Stream the answer and write each class file as soon as its code block completes'
+    )
+    return parser
@@ -12,8 +12,9 @@ Run it from the repository root, for example:
 
 from __future__ import annotations
 
+import mmap
 import pathlib
-from typing import List
+import sys
 
 from Bus_Protocol_Library import get_skeleton_dir  # type: ignore
 
@@ -35,9 +36,29 @@ def show_file_head(protocol: str, filename: str, n_lines: int = 20) -> None:
         print(f"[missing] {target}")
         return
 
-    lines: List[str] = target.read_text(encoding="utf-8").splitlines(keepends=True)
-    for line in lines[:n_lines]:
-        print(line, end="")
+    # Replaced streams (StringIO, redirect_stdout) have no binary buffer.
+    out = getattr(sys.stdout, "buffer", None)
+
+    # Map the file and copy out only the bytes of the lines we print.
+    with open(target, "rb") as fh:
+        if target.stat().st_size == 0:
+            return
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # Text already printed must reach stdout before raw bytes do.
+            sys.stdout.flush()
+            pos = 0
+            for _ in range(n_lines):
+                if pos >= len(mm):
+                    break
+                end = mm.find(b"\n", pos) + 1 or len(mm)
+                chunk = mm[pos:end]
+                if out is None:
+                    sys.stdout.write(chunk.decode())
+                else:
+                    out.write(chunk)
+                pos = end
+    if out is not None:
+        out.flush()
 
 
 def main() -> None:
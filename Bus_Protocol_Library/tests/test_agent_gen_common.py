@@ -0,0 +1,160 @@
+"""
+Checks for the shared agent-generator helpers. No network calls are made.
+
+Run from the repository root:
+
+    python -m unittest discover -s Bus_Protocol_Library/tests
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import io
+import os
+import pathlib
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+
+# Make the package importable when running from a cloned repository.
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[2]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from Bus_Protocol_Library import agent_gen_common as common  # type: ignore  # noqa: E402
+
+
+ANSWER = (
+    "Here is the agent.\n"
+    "```systemverilog\nclass ahb_driver;\nendclass : ahb_driver\n```\n"
+    "Some prose with a stray ``` fence.\n"
+    "```SystemVerilog\nclass ahb_monitor;\nendclass : ahb_monitor\n"
+    "class ahb_agent;\nendclass : ahb_agent\n```\n"
+)
+
+
+def chunked(text, size):
+    return [text[k:k + size] for k in range(0, len(text), size)]
+
+
+class SVBlockStreamParserTest(unittest.TestCase):
+    def test_chunked_feed_matches_full_answer_regex(self) -> None:
+        expected = common.SV_BLOCK_PATTERN.findall(ANSWER)
+        for size in (1, 2, 3, 7, 16, len(ANSWER)):
+            parser = common.SVBlockStreamParser()
+            blocks = []
+            for chunk in chunked(ANSWER, size):
+                blocks.extend(parser.feed(chunk))
+            self.assertEqual(blocks, expected, f"chunk size {size}")
+
+    def test_block_is_returned_when_its_closing_fence_arrives(self) -> None:
+        parser = common.SVBlockStreamParser()
+        self.assertEqual(parser.feed("```system"), [])
+        self.assertEqual(parser.feed("verilog\nclass a;\nendclass : a\n`"), [])
+        self.assertTrue(parser.in_code)
+        self.assertEqual(parser.feed("``\nafter"), ["\nclass a;\nendclass : a\n"])
+        self.assertFalse(parser.in_code)
+
+    def test_stream_agent_files_writes_classes_and_answer(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            answer_path = os.path.join(tmp, "answer1.md")
+            combined_path = os.path.join(tmp, "agent_file.sv")
+            out_dir = os.path.join(tmp, "out")
+            common.stream_agent_files(chunked(ANSWER, 5), answer_path, combined_path, out_dir)
+
+            with open(answer_path, encoding="utf-8") as f:
+                self.assertEqual(f.read(), ANSWER)
+            self.assertFalse(os.path.exists(combined_path))
+            self.assertEqual(
+                sorted(os.listdir(out_dir)),
+                ["ahb_agent.sv", "ahb_driver.sv", "ahb_monitor.sv"],
+            )
+            data = pathlib.Path(out_dir, "ahb_driver.sv").read_bytes()
+            self.assertEqual(data, common.UVM_IMPORT_PREFIX + b"class ahb_driver;\nendclass : ahb_driver")
+
+
+class FakeLLM:
+    """Stands in for get_request: records each call and returns a canned answer."""
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.calls = []
+
+    def __call__(self, prompt, session=None, system=None, **kwargs):
+        self.calls.append((prompt, system))
+        return self.answer
+
+
+class ProcessReqDirTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        self.req_files = []
+        for name in ("mod_a", "mod_b"):
+            path = os.path.join(self.root, f"{name}.md")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(f"requirements for {name}\n")
+            self.req_files.append(path)
+        self.cache_dir = os.path.join(self.root, ".cache", "ahb_agent")
+
+    def run_dir(self, llm, output_dir, **kwargs):
+        with mock.patch.object(common, "get_request", llm), \
+                mock.patch.object(common, "get_session", lambda pool_size=1: None):
+            asyncio.run(common.process_req_dir(
+                self.req_files, "TEMPLATE", "IFACE", os.path.join(self.root, output_dir), 2,
+                "SYSTEM", cache_dir=self.cache_dir, **kwargs,
+            ))
+
+    def test_cache_key_depends_on_system_prefix_and_model(self) -> None:
+        key = common.cache_key("SYSTEM", "prompt")
+        self.assertEqual(key, common.cache_key("SYSTEM", "prompt"))
+        self.assertNotEqual(key, common.cache_key("SYSTEM v2", "prompt"))
+        self.assertNotEqual(key, common.cache_key("SYSTEM", "prompt", model="other-model"))
+
+    def test_second_run_is_served_from_cache(self) -> None:
+        llm = FakeLLM(ANSWER)
+        self.run_dir(llm, "out1")
+        self.assertEqual(len(llm.calls), 2)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+        self.run_dir(llm, "out2")
+        self.assertEqual(len(llm.calls), 2)
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(self.root, "out2", "mod_a"))),
+            ["ahb_agent.sv", "ahb_driver.sv", "ahb_monitor.sv", "answer1.md"],
+        )
+
+    def test_batch_item_without_block_is_reported(self) -> None:
+        llm = FakeLLM("```systemverilog name=mod_a\nclass a1;\nendclass : a1\n```\n")
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            self.run_dir(llm, "out", batch_size=2)
+
+        self.assertEqual(len(llm.calls), 1)
+        self.assertIn("[warn] no code block returned for 'mod_b' in batch 0", stdout.getvalue())
+        self.assertTrue(os.path.exists(os.path.join(self.root, "out", "mod_a", "a1.sv")))
+        self.assertFalse(os.path.exists(os.path.join(self.root, "out", "mod_b")))
+
+
+class SplitClassesTest(unittest.TestCase):
+    def test_classes_are_split_on_their_named_endclass(self) -> None:
+        content = (
+            "class a extends uvm_driver;\n  // endclass : b is not the end\nendclass : a\n\n"
+            "class b;\nendclass : b\n"
+            "class orphan;\n"
+        )
+        self.assertEqual(
+            list(common.split_classes(content)),
+            [
+                ("a", "class a extends uvm_driver;\n  // endclass : b is not the end\nendclass : a"),
+                ("b", "class b;\nendclass : b"),
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,19 +6,37 @@ Repairs obviously incomplete always headers (missing sensitivity lists, etc.).
 
 import re
 import os
+from itertools import accumulate
 from typing import List, Dict, Optional
 
+from .diagnostics import DiagnosticBuffer
+
+_RE_MODULE = re.compile(r"module\s+(\w+)")
+_RE_ALWAYS_BARE = re.compile(r"\balways\s*$")
+_RE_ALWAYS_EMPTY = re.compile(r"\balways\s*\(\s*\)$")
+_RE_ALWAYS_AT_BARE = re.compile(r"\balways\s*@\s*$")
+_RE_ALWAYS_AT_EMPTY = re.compile(r"\balways\s*@\s*\(\s*\)$")
+# The four incomplete-header forms above as one pattern with two optional
+# parts, so a candidate is matched in a single pass without alternation.
+_RE_INCOMPLETE_ALWAYS = re.compile(r"\balways\s*(?:@\s*)?(?:\(\s*\))?$")
+_RE_INPUT_CLK = re.compile(r"input.*?(\w*clk\w*)")
+
+_MESSAGES = {
+    "fixed_header": "   fixed incomplete always header (line {})",
+}
+
 
 class AlwaysBlockPatcher:
     """Patcher for Verilog always blocks."""
 
-    def __init__(self, source_file_path: Optional[str] = None):
+    def __init__(self, source_file_path: Optional[str] = None, verbose: bool = True):
         self.source_file_path = source_file_path
         self.source_lines: List[str] = []
         self.source_always_blocks: Dict[str, List[Dict]] = {}
         self.fixes_made = 0
         self.incomplete_blocks_fixed = 0
         self.orphan_begin_blocks_fixed = 0
+        self.diagnostics = DiagnosticBuffer(_MESSAGES, verbose)
 
         if source_file_path and os.path.exists(source_file_path):
             self._load_source_file()
@@ -45,7 +63,7 @@ class AlwaysBlockPatcher:
             line = self.source_lines[i].strip()
 
             if line.startswith("module "):
-                match = re.match(r"module\s+(\w+)", line)
+                match = _RE_MODULE.match(line)
                 if match:
                     current_module = match.group(1)
                     self.source_always_blocks[current_module] = []
@@ -91,64 +109,85 @@ class AlwaysBlockPatcher:
         Only obviously incomplete headers are changed (e.g. 'always', 'always@').
         Body lines are preserved.
         """
-        fixed_lines: List[str] = []
-        i = 0
+        self.fixes_made = 0
+        self.incomplete_blocks_fixed = 0
+        self.orphan_begin_blocks_fixed = 0
+        self.diagnostics.clear()
 
-        while i < len(rtl_lines):
-            line = rtl_lines[i]
-            line_clean = line.strip()
+        # every incomplete header contains the keyword
+        if not any("always" in line for line in rtl_lines):
+            return list(rtl_lines)
 
-            if self._is_incomplete_always_block(line_clean):
-                fixed_line = self._fix_incomplete_always_block(line, rtl_lines, i)
+        fixed_lines: List[str] = []
+        stripped = [line.strip() for line in rtl_lines]
+
+        # Module-wide hints, computed once on the first incomplete header.
+        clock_signal: Optional[str] = None
+        nbassign_prefix: List[int] = []
+
+        for i, line in enumerate(rtl_lines):
+            if self._is_incomplete_always_block(stripped[i]):
+                if clock_signal is None:
+                    clock_signal = self._detect_clock_signal(rtl_lines, stripped)
+                    nbassign_prefix = list(
+                        accumulate(
+                            (
+                                "<=" in raw and not clean.startswith("//")
+                                for raw, clean in zip(rtl_lines, stripped)
+                            ),
+                            initial=0,
+                        )
+                    )
+                fixed_line = self._fix_incomplete_always_block(
+                    rtl_lines, stripped, i, clock_signal, nbassign_prefix
+                )
                 fixed_lines.append(fixed_line)
                 self.incomplete_blocks_fixed += 1
-                print(f"   fixed incomplete always header (line {i+1})")
+                self.diagnostics.add("fixed_header", i + 1)
             else:
                 fixed_lines.append(line)
 
-            i += 1
-
+        self.diagnostics.flush()
         return fixed_lines
 
     def _is_incomplete_always_block(self, line_clean: str) -> bool:
         """Detect obviously incomplete always headers."""
-        patterns = [
-            r"\balways\s*$",
-            r"\balways\s*\(\s*\)$",
-            r"\balways\s*@\s*$",
-            r"\balways\s*@\s*\(\s*\)$",
-        ]
-        return any(re.search(pattern, line_clean) for pattern in patterns)
+        # Every incomplete form contains the keyword; skip the regex otherwise.
+        if "always" not in line_clean:
+            return False
+        return _RE_INCOMPLETE_ALWAYS.search(line_clean) is not None
 
     def _fix_incomplete_always_block(
         self,
-        line: str,
         rtl_lines: List[str],
+        stripped: List[str],
         line_idx: int,
+        clock_signal: str,
+        nbassign_prefix: List[int],
     ) -> str:
         """Patch incomplete always headers with a reasonable sensitivity list."""
-        line_clean = line.strip()
+        line = rtl_lines[line_idx]
+        line_clean = stripped[line_idx]
         indent = self._get_indent(line)
 
-        clock_signal = self._detect_clock_signal(rtl_lines)
-        has_seq = self._has_sequential_logic_nearby(rtl_lines, line_idx)
+        has_seq = self._has_sequential_logic_nearby(nbassign_prefix, line_idx)
 
         # Prefer a sequential-style header when we can detect a clock and
         # see non-blocking assignments in the nearby body.
-        if re.search(r"\balways\s*$", line_clean):
+        if _RE_ALWAYS_BARE.search(line_clean):
             if has_seq and clock_signal:
                 return f"{indent}always @(posedge {clock_signal}) begin\n"
             return f"{indent}always @(*) begin\n"
 
-        if re.search(r"\balways\s*\(\s*\)$", line_clean):
+        if _RE_ALWAYS_EMPTY.search(line_clean):
             return line.replace("always ()", "always @(*)")
 
-        if re.search(r"\balways\s*@\s*$", line_clean):
+        if _RE_ALWAYS_AT_BARE.search(line_clean):
             if has_seq and clock_signal:
                 return f"{indent}always @(posedge {clock_signal}) begin\n"
             return f"{indent}always @(*) begin\n"
 
-        if re.search(r"\balways\s*@\s*\(\s*\)$", line_clean):
+        if _RE_ALWAYS_AT_EMPTY.search(line_clean):
             return line.replace("always @()", "always @(*)")
 
         if has_seq and clock_signal:
@@ -156,12 +195,12 @@ class AlwaysBlockPatcher:
 
         return line
 
-    def _detect_clock_signal(self, rtl_lines: List[str]) -> str:
+    def _detect_clock_signal(self, rtl_lines: List[str], stripped: List[str]) -> str:
         """Heuristic clock signal detection from module header or body."""
-        for line in rtl_lines[:50]:
-            line_clean = line.strip().lower()
+        for line in stripped[:50]:
+            line_clean = line.lower()
             if "input" in line_clean and ("clk" in line_clean or "clock" in line_clean):
-                match = re.search(r"input.*?(\w*clk\w*)", line_clean)
+                match = _RE_INPUT_CLK.search(line_clean)
                 if match:
                     return match.group(1)
 
@@ -173,20 +212,25 @@ class AlwaysBlockPatcher:
 
         return "clk"
 
-    def _has_sequential_logic_nearby(self, rtl_lines: List[str], line_idx: int) -> bool:
-        """Check nearby lines for non-blocking assignments as a hint of sequential logic."""
-        start = max(0, line_idx - 5)
-        end = min(len(rtl_lines), line_idx + 5)
+    def _has_sequential_logic_nearby(self, nbassign_prefix: List[int], line_idx: int) -> bool:
+        """
+        Check nearby lines for non-blocking assignments as a hint of sequential logic.
 
-        for i in range(start, end):
-            if "<=" in rtl_lines[i] and not rtl_lines[i].strip().startswith("//"):
-                return True
-        return False
+        `nbassign_prefix[i]` counts the non-comment lines containing '<=' among
+        the first i lines, so the window [line_idx-5, line_idx+5) costs O(1).
+        """
+        n = len(nbassign_prefix) - 1
+        return nbassign_prefix[min(n, line_idx + 5)] > nbassign_prefix[max(0, line_idx - 5)]
 
     def _get_indent(self, line: str) -> str:
         """Return indentation prefix."""
         return line[: len(line) - len(line.lstrip())]
 
+    @property
+    def fix_count(self) -> int:
+        """Number of always headers repaired by the last run."""
+        return self.incomplete_blocks_fixed
+
     def get_summary(self) -> str:
         """Return a human-readable summary of performed fixes."""
         if self.incomplete_blocks_fixed > 0:
@@ -4,17 +4,60 @@ Assign statement patcher.
 Normalizes and repairs multi-line or malformed assign statements.
 """
 
+from __future__ import annotations
+
 import re
-from typing import List, Set, Dict, Tuple
+from typing import List, Optional, Tuple
+
+from .diagnostics import DiagnosticBuffer
+from .line_classifier import (
+    ASSIGN_START,
+    CONTINUATION,
+    INCOMPLETE_ASSIGNMENT,
+    NEW_STATEMENT,
+    ORPHAN_TERNARY,
+    LineTagCache,
+    clears_line_tags,
+    join_lines,
+)
+
+
+_RE_MULTIPLE_ASSIGNS = re.compile(r'(assign\s+[^=]+=\s*[^;]+?)\s+(assign\s+.*)')
+_RE_COMPLEX_TERNARY = re.compile(r'\?\s*else\s+if\s*\([^)]+\)\s*[^;:]+;\s*:')
+# An operator ('=', '?', ':' or a '=' pair) with its surrounding whitespace,
+# or a bare whitespace run; drives the single normalization pass.
+_RE_ASSIGN_TOKEN = re.compile(r'\s*(=\s*=|[=?:])\s*|\s+')
+
+# Diagnostic messages by event code; payloads are formatted in only when flushed.
+_MESSAGES = {
+    'merged_multiline': '   merged multi-line assign ({} lines -> 1 line)',
+    'split_multiple': '   split multiple assign statements on one line ({} statements)',
+    'fixed_syntax': '   fixed assign statement syntax',
+    'merged_orphan': '   merged orphan ternary/operator line',
+    'fixed_incomplete': '   fixed incomplete assignment',
+}
+
+# Default right-hand side appended to an incomplete assignment, keyed on its
+# last character ('<=' ends in '=' and takes the same literal).
+_INCOMPLETE_FIX = {
+    '=': " 1'b0;",
+    '?': " 1'b1 : 1'b0;",
+    ':': " 1'b0;",
+}
 
 
 class AssignStatementPatcher:
     """Patcher for Verilog assign statements."""
 
-    def __init__(self):
+    def __init__(self, verbose: bool = True, line_tag_cache: Optional[LineTagCache] = None):
+        # a cache passed in is shared with other patchers and cleared by its owner
+        self.owns_line_tags = line_tag_cache is None
+        self.line_tag_cache = LineTagCache() if line_tag_cache is None else line_tag_cache
         self.fixed_count = 0
         self.merged_count = 0
+        self.diagnostics = DiagnosticBuffer(_MESSAGES, verbose)
 
+    @clears_line_tags
     def fix_assign_statements(self, rtl_lines: List[str]) -> List[str]:
         """
         Repair assign statement syntax.
@@ -29,30 +72,29 @@ class AssignStatementPatcher:
         """
         self.fixed_count = 0
         self.merged_count = 0
+        self.diagnostics.clear()
+        events = self.diagnostics
         fixed_lines: List[str] = []
 
         i = 0
         while i < len(rtl_lines):
             line = rtl_lines[i]
-            line_clean = line.strip()
+            tags = self.line_tag_cache.raw_line_tags(line)
 
             # assign statement start
-            if self._is_assign_start(line_clean):
+            if tags & ASSIGN_START:
                 # collect full (possibly multi-line) assign
                 complete_assign, lines_consumed = self._collect_complete_assign(rtl_lines, i)
 
                 if lines_consumed > 1:
                     self.merged_count += 1
-                    print(f"   merged multi-line assign ({lines_consumed} lines -> 1 line)")
+                    events.add('merged_multiline', lines_consumed)
 
                 # check if there are multiple assigns on this merged line
                 multiple_assigns = self._split_multiple_assigns(complete_assign)
                 if len(multiple_assigns) > 1:
                     self.fixed_count += 1
-                    print(
-                        f"   split multiple assign statements on one line "
-                        f"({len(multiple_assigns)} statements)"
-                    )
+                    events.add('split_multiple', len(multiple_assigns))
                     for assign_stmt in multiple_assigns:
                         fixed_assign = self._fix_assign_statement(assign_stmt)
                         if fixed_assign.strip():
@@ -61,7 +103,7 @@ class AssignStatementPatcher:
                     fixed_assign = self._fix_assign_statement(complete_assign)
                     if fixed_assign != complete_assign:
                         self.fixed_count += 1
-                        print("   fixed assign statement syntax")
+                        events.add('fixed_syntax')
 
                     if fixed_assign.strip():
                         fixed_lines.append(fixed_assign)
@@ -69,23 +111,23 @@ class AssignStatementPatcher:
                 i += lines_consumed
 
             # orphan ternary part on its own line
-            elif self._is_orphan_ternary_part(line_clean):
+            elif tags & ORPHAN_TERNARY:
                 if fixed_lines and self._can_merge_with_previous(fixed_lines[-1], line):
                     merged_line = self._merge_ternary_lines(fixed_lines[-1], line)
                     fixed_lines[-1] = merged_line
                     self.fixed_count += 1
-                    print("   merged orphan ternary/operator line")
+                    events.add('merged_orphan')
                 else:
                     fixed_lines.append(line)
                 i += 1
 
             # incomplete assignment (e.g. line ends with '=')
-            elif self._is_incomplete_assignment(line_clean):
+            elif tags & INCOMPLETE_ASSIGNMENT:
                 fixed_line = self._fix_incomplete_assignment(line)
                 fixed_lines.append(fixed_line)
                 if fixed_line != line:
                     self.fixed_count += 1
-                    print("   fixed incomplete assignment")
+                    events.add('fixed_incomplete')
                 i += 1
 
             else:
@@ -93,61 +135,63 @@ class AssignStatementPatcher:
                 i += 1
 
         if self.fixed_count > 0 or self.merged_count > 0:
-            print(
-                f"   Assign patch: fixed {self.fixed_count} issues, "
-                f"merged {self.merged_count} multi-line assigns"
-            )
-
+            events.flush(f'   {self.get_summary()}')
+        else:
+            events.flush()
         return fixed_lines
 
+    def fix_assign_statements_to_buffer(self, rtl_lines: List[str]) -> str:
+        """Repair assign statements and return the patched text, one newline per line."""
+        return join_lines(self.fix_assign_statements(rtl_lines))
+
     def _is_assign_start(self, line_clean: str) -> bool:
         """Detect the start of an assign statement."""
-        return line_clean.startswith('assign ') and '=' in line_clean
+        return bool(self.line_tag_cache.line_tags(line_clean) & ASSIGN_START)
 
     def _collect_complete_assign(self, rtl_lines: List[str], start_idx: int) -> Tuple[str, int]:
-        """Collect a full assign statement that may span multiple lines."""
-        lines_consumed = 1
-        assign_parts = [rtl_lines[start_idx].strip()]
+        """
+        Collect a full assign statement that may span multiple lines.
 
-        first_line = assign_parts[0]
+        The scan only advances `end_idx`; the statement text is assembled from
+        the consumed slice once at the end.
+        """
+        first_line = rtl_lines[start_idx].strip()
         needs_continuation = (
             not first_line.endswith(';')
             or first_line.endswith(('|', '&', '^', '+', '-', '?', ':', '='))
         )
-
-        if needs_continuation:
-            i = start_idx + 1
-            while i < len(rtl_lines):
-                next_line = rtl_lines[i].strip()
-
-                # skip empty lines and comments as part of the multi-line construct
-                if not next_line or next_line.startswith('//'):
-                    i += 1
-                    lines_consumed += 1
-                    continue
-
-                # stop if a new statement starts and the line is not a continuation
-                if self._is_new_statement_start(next_line) and not self._is_continuation_line(next_line):
-                    break
-
-                assign_parts.append(next_line)
-                lines_consumed += 1
-
-                if next_line.endswith(';'):
-                    break
-
-                i += 1
-
-        complete_assign = ' '.join(assign_parts)
-        return complete_assign, lines_consumed
+        if not needs_continuation:
+            return first_line, 1
+
+        end_idx = start_idx + 1
+        while end_idx < len(rtl_lines):
+            next_line = rtl_lines[end_idx].strip()
+
+            # skip empty lines and comments as part of the multi-line construct
+            if not next_line or next_line.startswith('//'):
+                end_idx += 1
+                continue
+
+            # stop if a new statement starts and the line is not a continuation
+            next_tags = self.line_tag_cache.line_tags(next_line)
+            if next_tags & NEW_STATEMENT and not next_tags & CONTINUATION:
+                break
+
+            end_idx += 1
+            if next_line.endswith(';'):
+                break
+
+        # blank and comment lines are consumed but not part of the statement
+        complete_assign = ' '.join(
+            part
+            for part in map(str.strip, rtl_lines[start_idx:end_idx])
+            if part and not part.startswith('//')
+        )
+        return complete_assign, end_idx - start_idx
 
     def _is_new_statement_start(self, line_clean: str) -> bool:
         """Detect the beginning of a new statement."""
-        new_statement_keywords = [
-            'assign ', 'always', 'wire ', 'reg ', 'input ', 'output ',
-            'module ', 'endmodule', 'begin', 'end', 'if ', 'case ',
-        ]
-        return any(line_clean.startswith(keyword) for keyword in new_statement_keywords)
+        return bool(self.line_tag_cache.line_tags(line_clean) & NEW_STATEMENT)
 
     def _split_multiple_assigns(self, line: str) -> List[str]:
         """
@@ -157,8 +201,7 @@ class AssignStatementPatcher:
         parts: List[str] = []
         current = line.strip()
 
-        pattern = r'(assign\s+[^=]+=\s*[^;]+?)\s+(assign\s+.*)'
-        match = re.search(pattern, current)
+        match = _RE_MULTIPLE_ASSIGNS.search(current)
         if match:
             first_assign = match.group(1).strip()
             rest = match.group(2).strip()
@@ -181,9 +224,6 @@ class AssignStatementPatcher:
 
         fixed_line = self._fix_complex_ternary(fixed_line)
 
-        # '< =' -> '<='
-        fixed_line = re.sub(r'<\s*=', '<=', fixed_line)
-
         # first ensure ternary operator structure is complete on the expression
         fixed_line = self._fix_ternary_operator(fixed_line)
 
@@ -191,49 +231,49 @@ class AssignStatementPatcher:
         if not fixed_line.strip().endswith(';'):
             fixed_line = fixed_line.rstrip() + ';'
 
-        # normalize whitespace
-        fixed_line = re.sub(r'\s+', ' ', fixed_line)
-        fixed_line = re.sub(r'\s*=\s*', ' = ', fixed_line)
-        fixed_line = re.sub(r'\s*\?\s*', ' ? ', fixed_line)
-        fixed_line = re.sub(r'\s*:\s*', ' : ', fixed_line)
+        return self._normalize_assign(fixed_line)
 
-        # fix ' =  =' -> '=='
-        fixed_line = re.sub(r'=\s+=', '==', fixed_line)
+    def _normalize_assign(self, line: str) -> str:
+        """
+        Normalize whitespace around '=', '?' and ':' in one pass.
 
-        return fixed_line
+        Whitespace runs collapse to one space and each operator is padded with
+        single spaces; two operators of the same kind in a row keep two spaces
+        between them (different kinds share one), and adjacent '=' pairs fuse
+        into '==' from the left. Spacing inside '<=' / '< =' comes out as
+        '< =' either way, so no separate '<=' pass is needed.
+        """
+        last_end = -1
+        last_kind = ''
+
+        def replace(match: re.Match) -> str:
+            nonlocal last_end, last_kind
+            op = match.group(1)
+            if op is None:
+                return ' '
+            kind = op[0]
+            sep = '' if match.start() == last_end and kind != last_kind else ' '
+            last_end = match.end()
+            last_kind = kind
+            return f"{sep}{'==' if len(op) > 1 else op} "
+
+        return _RE_ASSIGN_TOKEN.sub(replace, line)
 
     def _fix_complex_ternary(self, line: str) -> str:
         """Handle complex or malformed ternary expressions."""
-        pattern = r'\?\s*else\s+if\s*\([^)]+\)\s*[^;:]+;\s*:'
-        if re.search(pattern, line):
-            line = re.sub(
-                r'\?\s*else\s+if\s*\([^)]+\)\s*[^;:]+;\s*:',
-                " ? 1'b0 :",
-                line,
-            )
-        return line
+        return _RE_COMPLEX_TERNARY.sub(" ? 1'b0 :", line)
 
     def _fix_ternary_operator(self, line: str) -> str:
         """Ensure each '?' has a matching ':' by appending a default branch."""
-        question_count = line.count('?')
-        colon_count = line.count(':')
-
-        if question_count > colon_count:
-            for _ in range(question_count - colon_count):
-                line += " : 1'b0"
+        missing = line.count('?') - line.count(':')
+        if missing > 0:
+            line += " : 1'b0" * missing
 
         return line
 
     def _is_orphan_ternary_part(self, line_clean: str) -> bool:
         """Detect a line that only contains part of a ternary or operator chain."""
-        ternary_patterns = [
-            r'^\s*\?\s*',
-            r'^\s*:\s*',
-            r'^\s*\|\s*',
-            r'^\s*&\s*',
-            r'^\s*\^\s*',
-        ]
-        return any(re.match(pattern, line_clean) for pattern in ternary_patterns)
+        return bool(self.line_tag_cache.line_tags(line_clean) & ORPHAN_TERNARY)
 
     def _can_merge_with_previous(self, prev_line: str, curr_line: str) -> bool:
         """Decide whether current line can be merged with previous line."""
@@ -253,47 +293,26 @@ class AssignStatementPatcher:
 
     def _merge_ternary_lines(self, prev_line: str, curr_line: str) -> str:
         """Merge two consecutive lines that belong to a single ternary expression."""
-        return prev_line.rstrip() + ' ' + curr_line.strip()
+        return f'{prev_line.rstrip()} {curr_line.strip()}'
 
     def _is_incomplete_assignment(self, line_clean: str) -> bool:
         """Detect assignments that end with an operator and miss the right-hand side."""
-        incomplete_patterns = [
-            r'=\s*$',
-            r'<=\s*$',
-            r'\?\s*$',
-            r':\s*$',
-        ]
-        return any(re.search(pattern, line_clean) for pattern in incomplete_patterns)
+        return bool(self.line_tag_cache.line_tags(line_clean) & INCOMPLETE_ASSIGNMENT)
 
     def _fix_incomplete_assignment(self, line: str) -> str:
         """Patch incomplete assignments with a default literal."""
-        line_clean = line.strip()
-
-        if line_clean.endswith('='):
-            return line.rstrip() + " 1'b0;"
-        if line_clean.endswith('<='):
-            return line.rstrip() + " 1'b0;"
-        if line_clean.endswith('?'):
-            return line.rstrip() + " 1'b1 : 1'b0;"
-        if line_clean.endswith(':'):
-            return line.rstrip() + " 1'b0;"
-
-        return line
+        head = line.rstrip()
+        fix = _INCOMPLETE_FIX.get(head[-1:])
+        return head + fix if fix is not None else line
 
     def _is_continuation_line(self, line_clean: str) -> bool:
         """Detect continuation lines that belong to a previous statement."""
-        continuation_patterns = [
-            r'^\s*\|\s*',
-            r'^\s*&\s*',
-            r'^\s*\^\s*',
-            r'^\s*\+\s*',
-            r'^\s*-\s*',
-            r'^\s*\?\s*',
-            r'^\s*:\s*',
-            r'^\s*==\s*',
-            r'^\s*!=\s*',
-        ]
-        return any(re.match(pattern, line_clean) for pattern in continuation_patterns)
+        return bool(self.line_tag_cache.line_tags(line_clean) & CONTINUATION)
+
+    @property
+    def fix_count(self) -> int:
+        """Number of repairs made by the last run (fixes plus merges)."""
+        return self.fixed_count + self.merged_count
 
     def get_summary(self) -> str:
         """Return a human-readable summary of performed fixes."""
@@ -6,114 +6,125 @@ Provides:
   2) Completion of missing endcase tokens.
 """
 
-import re
-from typing import List, Dict, Tuple
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import List, Dict, Optional
+
+from .diagnostics import DiagnosticBuffer
+from .line_classifier import (
+    CASE_BODY_STATEMENT,
+    CASE_OPEN,
+    CASE_TERMINATOR,
+    ENDCASE,
+    LineTagCache,
+    clears_line_tags,
+    join_lines,
+)
+
+_MESSAGES = {
+    "removed_empty": "   mark empty case block for removal: lines {}-{}",
+    "inserted_endcase": "   inserted missing 'endcase'",
+    "inserted_endcase_eof": "   inserted missing 'endcase' at end of file",
+}
+
+
+def _leading_indent(line: str) -> str:
+    """Return the leading run of spaces and tabs of a line."""
+    return line[: len(line) - len(line.lstrip(" \t"))]
+
+
+@lru_cache(maxsize=256)
+def _endcase_line(indent: str) -> str:
+    """Return the endcase line for an indent; one shared string per indent."""
+    return f"{indent}endcase"
 
 
 class CaseStatementPatcher:
     """Patcher for Verilog case statements."""
 
-    def __init__(self):
+    def __init__(self, verbose: bool = True, line_tag_cache: Optional[LineTagCache] = None):
+        # a cache passed in is shared with other patchers and cleared by its owner
+        self.owns_line_tags = line_tag_cache is None
+        self.line_tag_cache = LineTagCache() if line_tag_cache is None else line_tag_cache
         # stack for nested case blocks
         self.case_stack: List[Dict] = []
         self.fixed_count = 0
         self.removed_count = 0
+        self.diagnostics = DiagnosticBuffer(_MESSAGES, verbose)
 
+    @clears_line_tags
     def fix_case_statements(self, rtl_lines: List[str]) -> List[str]:
         """
         Repair case statement syntax.
 
         Strategy:
         1. Identify all case...endcase regions.
-        2. Remove case regions that contain no executable content.
+        2. Remove case regions that contain no executable content (one pass).
         3. Insert missing endcase tokens where indentation suggests termination.
         """
         self.fixed_count = 0
         self.removed_count = 0
+        self.diagnostics.clear()
+
+        # without a case(...) line neither pass changes anything
+        if not any(self.line_tag_cache.raw_line_tags(line) & CASE_OPEN for line in rtl_lines):
+            return list(rtl_lines)
 
         cleaned = self._remove_empty_case_blocks(rtl_lines)
         fixed = self._fix_missing_endcase(cleaned)
 
+        summary: List[str] = []
         if self.removed_count > 0:
-            print(f"   Case patch: removed {self.removed_count} empty case blocks")
+            summary.append(f"   Case patch: removed {self.removed_count} empty case blocks")
         if self.fixed_count > 0:
-            print(f"   Case patch: inserted {self.fixed_count} missing 'endcase'")
+            summary.append(f"   Case patch: inserted {self.fixed_count} missing 'endcase'")
+        self.diagnostics.flush(*summary)
 
         return fixed
 
-    def _remove_empty_case_blocks(self, rtl_lines: List[str]) -> List[str]:
-        """Remove case blocks that only contain labels, comments, or blank lines."""
-        case_structures = self._identify_case_structures(rtl_lines)
-
-        empty_case_ranges: List[Tuple[int, int]] = []
-        for case_struct in case_structures:
-            if self._is_empty_case_structure(rtl_lines, case_struct):
-                empty_case_ranges.append((case_struct["start"], case_struct["end"]))
-                self.removed_count += 1
-                print(
-                    "   mark empty case block for removal: "
-                    f"lines {case_struct['start']}-{case_struct['end']}"
-                )
-
-        if not empty_case_ranges:
-            return rtl_lines
-
-        empty_case_ranges.sort(key=lambda x: x[0], reverse=True)
-        filtered = list(rtl_lines)
-
-        for start_idx, end_idx in empty_case_ranges:
-            del filtered[start_idx : end_idx + 1]
-
-        return filtered
-
-    def _identify_case_structures(self, rtl_lines: List[str]) -> List[Dict[str, int]]:
-        """Locate all case...endcase regions."""
-        case_structures: List[Dict[str, int]] = []
-        i = 0
+    def fix_case_statements_to_buffer(self, rtl_lines: List[str]) -> str:
+        """Repair case statements and return the patched text, one newline per line."""
+        return join_lines(self.fix_case_statements(rtl_lines))
 
-        while i < len(rtl_lines):
-            line = rtl_lines[i].strip()
-
-            if re.search(r"\bcase\s*\(", line):
-                case_start = i
-                j = i + 1
-                case_end = None
-                while j < len(rtl_lines):
-                    check_line = rtl_lines[j].strip()
-                    if check_line == "endcase" or check_line.startswith("endcase"):
-                        case_end = j
-                        break
-                    j += 1
-
-                if case_end is not None:
-                    case_structures.append({"start": case_start, "end": case_end})
-                    i = case_end
-
-            i += 1
-
-        return case_structures
-
-    def _is_empty_case_structure(self, rtl_lines: List[str], case_struct: Dict[str, int]) -> bool:
-        """Decide whether a case block has no executable statements."""
-        start_idx = case_struct["start"]
-        end_idx = case_struct["end"]
+    def _remove_empty_case_blocks(self, rtl_lines: List[str]) -> List[str]:
+        """
+        Remove case blocks that only contain labels, comments, or blank lines.
 
-        for i in range(start_idx + 1, end_idx):
-            if i >= len(rtl_lines):
-                continue
+        Single pass: each case(...) line opens a region that closes at the next
+        endcase line; the region is copied to the output only if one of its
+        body lines is executable.
+        """
+        filtered: List[str] = []
+        case_start = -1
+        has_executable = False
 
-            line = rtl_lines[i].strip()
+        for i, line in enumerate(rtl_lines):
+            tags = self.line_tag_cache.raw_line_tags(line)
 
-            if not line or line.startswith("//"):
+            if case_start == -1:
+                if tags & CASE_OPEN:
+                    case_start = i
+                    has_executable = False
+                else:
+                    filtered.append(line)
                 continue
 
-            if line.startswith("default:") or re.match(r"\s*\{[^}]+\}\s*:\s*$", line):
-                continue
+            if tags & ENDCASE:
+                if has_executable:
+                    filtered.extend(rtl_lines[case_start : i + 1])
+                else:
+                    self.removed_count += 1
+                    self.diagnostics.add("removed_empty", case_start, i)
+                case_start = -1
+            elif tags & CASE_BODY_STATEMENT:
+                has_executable = True
 
-            if "=" in line or any(keyword in line for keyword in ["begin", "if", "for", "while"]):
-                return False
+        # a case without endcase is not a complete region: keep it as-is
+        if case_start != -1:
+            filtered.extend(rtl_lines[case_start:])
 
-        return True
+        return filtered
 
     def _fix_missing_endcase(self, rtl_lines: List[str]) -> List[str]:
         """Insert endcase tokens where case blocks appear to terminate."""
@@ -123,30 +134,32 @@ class CaseStatementPatcher:
         i = 0
         while i < len(rtl_lines):
             line = rtl_lines[i]
-            line_clean = line.strip()
+            tags = self.line_tag_cache.raw_line_tags(line)
 
-            if re.search(r"\bcase\s*\(", line_clean):
+            if tags & CASE_OPEN:
                 fixed_lines.append(line)
+                indent = self._get_indent(line)
                 self.case_stack.append(
                     {
                         "line_num": i,
-                        "indent": self._get_indent(line),
+                        "indent": indent,
+                        "indent_len": len(indent),
                         "found_endcase": False,
                     }
                 )
 
-            elif line_clean == "endcase" or line_clean.startswith("endcase"):
+            elif tags & ENDCASE:
                 fixed_lines.append(line)
                 if self.case_stack:
                     self.case_stack[-1]["found_endcase"] = True
                     self.case_stack.pop()
 
-            elif self._should_check_for_missing_endcase(line_clean) and self.case_stack:
+            elif tags & CASE_TERMINATOR and self.case_stack:
                 missing_endcases = self._check_missing_endcases(line)
                 for endcase_indent in missing_endcases:
-                    fixed_lines.append(f"{endcase_indent}endcase")
+                    fixed_lines.append(_endcase_line(endcase_indent))
                     self.fixed_count += 1
-                    print("   inserted missing 'endcase'")
+                    self.diagnostics.add("inserted_endcase")
 
                 fixed_lines.append(line)
 
@@ -158,39 +171,25 @@ class CaseStatementPatcher:
         while self.case_stack:
             case_info = self.case_stack.pop()
             if not case_info["found_endcase"]:
-                fixed_lines.append(f"{case_info['indent']}endcase")
+                fixed_lines.append(_endcase_line(case_info["indent"]))
                 self.fixed_count += 1
-                print("   inserted missing 'endcase' at end of file")
+                self.diagnostics.add("inserted_endcase_eof")
 
         return fixed_lines
 
     def _should_check_for_missing_endcase(self, line_clean: str) -> bool:
         """Heuristic: lines that likely mark the end of a case block."""
-        check_keywords = [
-            "always",
-            "assign",
-            "wire ",
-            "reg ",
-            "input ",
-            "output ",
-            "module ",
-            "endmodule",
-            "begin",
-            "end",
-            "if ",
-            "else",
-        ]
-        return any(line_clean.startswith(keyword) for keyword in check_keywords)
+        return bool(self.line_tag_cache.line_tags(line_clean) & CASE_TERMINATOR)
 
     def _check_missing_endcases(self, line: str) -> List[str]:
         """Determine how many endcase tokens to insert and with which indentation."""
         missing_endcases: List[str] = []
-        line_indent = self._get_indent(line)
+        line_indent_len = len(self._get_indent(line))
 
         while self.case_stack:
             case_info = self.case_stack[-1]
             if not case_info["found_endcase"]:
-                if len(line_indent) <= len(case_info["indent"]):
+                if line_indent_len <= case_info["indent_len"]:
                     missing_endcases.append(case_info["indent"])
                     case_info["found_endcase"] = True
                     self.case_stack.pop()
@@ -203,13 +202,12 @@ class CaseStatementPatcher:
 
     def _get_indent(self, line: str) -> str:
         """Return indentation prefix of a line."""
-        indent = ""
-        for ch in line:
-            if ch in (" ", "\t"):
-                indent += ch
-            else:
-                break
-        return indent
+        return _leading_indent(line)
+
+    @property
+    def fix_count(self) -> int:
+        """Number of repairs made by the last run (removed blocks plus endcases)."""
+        return self.removed_count + self.fixed_count
 
     def get_summary(self) -> str:
         """Return a human-readable summary of performed fixes."""
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Diagnostic buffer shared by the patchers.
+Fix events are recorded as (code, payload) pairs while a patcher runs and
+formatted only when flushed, so the hot loops never touch stdout.
+"""
+
+import sys
+from collections import deque
+from typing import Deque, Dict, Tuple
+
+
+class DiagnosticBuffer:
+    """Collect patch events and write them to stdout in one call."""
+
+    def __init__(self, messages: Dict[str, str], verbose: bool = True):
+        self.messages = messages
+        self.verbose = verbose
+        self._events: Deque[Tuple[str, tuple]] = deque()
+
+    def add(self, code: str, *payload) -> None:
+        """Record one event; `payload` fills the placeholders of its message."""
+        self._events.append((code, payload))
+
+    def clear(self) -> None:
+        """Drop all pending events."""
+        self._events.clear()
+
+    def flush(self, *trailer: str) -> None:
+        """Write pending events followed by `trailer` lines, then clear."""
+        if self.verbose:
+            lines = [self.messages[code].format(*payload) for code, payload in self._events]
+            lines.extend(trailer)
+            if lines:
+                sys.stdout.write("\n".join(lines) + "\n")
+        self._events.clear()
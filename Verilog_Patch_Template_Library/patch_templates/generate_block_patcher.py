@@ -4,28 +4,73 @@ Generate-block patcher.
 Wraps orphaned labeled begin blocks into proper generate/endgenerate regions.
 """
 
+from __future__ import annotations
+
 import re
-from typing import List, Dict
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple
+
+from .diagnostics import DiagnosticBuffer
+from .line_classifier import (
+    BLOCK_STOP,
+    LABELED_BEGIN,
+    LineTagCache,
+    clears_line_tags,
+    join_lines,
+    labeled_begin_name,
+)
+
+
+_RE_INDEX_VAR = re.compile(r"\[(?:[IiJjKk]|idx|index)\]")
+_RE_PARAMETER = re.compile(r"parameter\s+(\w+)\s*=\s*(\d+)")
+
+_MESSAGES = {
+    "wrapped_blocks": "   wrapped {} orphan begin blocks into a generate region",
+}
+
+
+@lru_cache(maxsize=256)
+def _generate_frame(indent: str) -> Tuple[str, str, str, str]:
+    """
+    Return the (genvar, generate, loop end, endgenerate) lines for an indent.
+
+    Wrapped regions mostly share a handful of indents, so each distinct
+    frame is formatted once and its strings are reused.
+    """
+    return (
+        f"{indent}genvar I;\n",
+        f"{indent}generate\n",
+        f"{indent}  end\n",
+        f"{indent}endgenerate\n",
+    )
 
 
 class GenerateBlockPatcher:
     """Patcher for Verilog generate blocks."""
 
-    def __init__(self):
+    def __init__(self, verbose: bool = True, line_tag_cache: Optional[LineTagCache] = None):
+        # a cache passed in is shared with other patchers and cleared by its owner
+        self.owns_line_tags = line_tag_cache is None
+        self.line_tag_cache = LineTagCache() if line_tag_cache is None else line_tag_cache
         self.fixes_made = 0
         self.orphan_blocks_fixed = 0
         self.missing_genvar_added = 0
+        self.diagnostics = DiagnosticBuffer(_MESSAGES, verbose)
 
+    @clears_line_tags
     def fix_generate_blocks(self, rtl_lines: List[str]) -> List[str]:
         """Repair generate-related syntax around labeled begin blocks."""
         fixed_lines: List[str] = []
+        self.fixes_made = 0
+        self.orphan_blocks_fixed = 0
+        self.missing_genvar_added = 0
+        self.diagnostics.clear()
         i = 0
 
         while i < len(rtl_lines):
             line = rtl_lines[i]
-            line_clean = line.strip()
 
-            if self._is_orphan_generate_block(line_clean):
+            if self.line_tag_cache.raw_line_tags(line) & LABELED_BEGIN:
                 blocks_info = self._collect_orphan_blocks(rtl_lines, i)
 
                 if blocks_info["blocks"]:
@@ -34,10 +79,7 @@ class GenerateBlockPatcher:
 
                     i = blocks_info["end_idx"] + 1
                     self.orphan_blocks_fixed += len(blocks_info["blocks"])
-                    print(
-                        f"   wrapped {len(blocks_info['blocks'])} "
-                        f"orphan begin blocks into a generate region"
-                    )
+                    self.diagnostics.add("wrapped_blocks", len(blocks_info["blocks"]))
                 else:
                     fixed_lines.append(line)
                     i += 1
@@ -45,11 +87,22 @@ class GenerateBlockPatcher:
                 fixed_lines.append(line)
                 i += 1
 
+        self.diagnostics.flush()
         return fixed_lines
 
-    def _is_orphan_generate_block(self, line_clean: str) -> bool:
-        """Detect lines of the form 'begin: label' that are not clearly inside generate."""
-        return re.match(r"^\s*begin\s*:\s*\w+\s*$", line_clean) is not None
+    def fix_generate_blocks_to_buffer(self, rtl_lines: List[str]) -> str:
+        """Repair generate blocks and return the patched text, one newline per line."""
+        return join_lines(self.fix_generate_blocks(rtl_lines))
+
+    def _is_orphan_generate_block(self, line_clean: str) -> Optional[str]:
+        """
+        Detect lines of the form 'begin: label' that are not clearly inside generate.
+
+        Returns the label, or None when the line is not a labeled begin.
+        """
+        if self.line_tag_cache.line_tags(line_clean) & LABELED_BEGIN:
+            return labeled_begin_name(line_clean)
+        return None
 
     def _collect_orphan_blocks(self, rtl_lines: List[str], start_idx: int) -> Dict:
         """Collect consecutive labeled begin blocks that should be wrapped in generate."""
@@ -58,11 +111,10 @@ class GenerateBlockPatcher:
         genvar_needed = False
 
         while current_idx < len(rtl_lines):
-            line = rtl_lines[current_idx]
-            line_clean = line.strip()
+            label = self._is_orphan_generate_block(rtl_lines[current_idx].strip())
 
-            if self._is_orphan_generate_block(line_clean):
-                block_info = self._collect_single_block(rtl_lines, current_idx)
+            if label is not None:
+                block_info = self._collect_single_block(rtl_lines, current_idx, label)
                 if block_info:
                     blocks.append(block_info)
                     current_idx = block_info["end_idx"] + 1
@@ -81,29 +133,26 @@ class GenerateBlockPatcher:
             "needs_genvar": genvar_needed,
         }
 
-    def _collect_single_block(self, rtl_lines: List[str], start_idx: int) -> Dict:
-        """Collect a single labeled begin block [begin:label ...]."""
+    def _collect_single_block(
+        self, rtl_lines: List[str], start_idx: int, label: Optional[str] = None
+    ) -> Dict:
+        """
+        Collect a single labeled begin block [begin:label ...].
+
+        `label` may be passed when the caller has already parsed the start line.
+        """
         if start_idx >= len(rtl_lines):
             return None
 
-        start_line = rtl_lines[start_idx].strip()
-        label_match = re.match(r"^\s*begin\s*:\s*(\w+)\s*$", start_line)
-        if not label_match:
-            return None
+        if label is None:
+            label = labeled_begin_name(rtl_lines[start_idx].strip())
+            if label is None:
+                return None
 
-        label = label_match.group(1)
         current_idx = start_idx + 1
 
         while current_idx < len(rtl_lines):
-            line = rtl_lines[current_idx]
-            line_clean = line.strip()
-
-            if self._is_orphan_generate_block(line_clean):
-                break
-
-            if line_clean.startswith(("endmodule", "module ", "always", "assign")) or re.match(
-                r"^\s*end\s*;?\s*$", line_clean
-            ):
+            if self.line_tag_cache.raw_line_tags(rtl_lines[current_idx]) & (LABELED_BEGIN | BLOCK_STOP):
                 break
 
             current_idx += 1
@@ -117,23 +166,25 @@ class GenerateBlockPatcher:
 
     def _block_needs_genvar(self, block_info: Dict, rtl_lines: List[str]) -> bool:
         """Heuristic: does this block appear to use an index variable like [I] or [i]?"""
-        for i in range(block_info["start_idx"], block_info["end_idx"] + 1):
-            if i < len(rtl_lines):
-                line = rtl_lines[i]
-                if re.search(r"\[[IiJjKk]\]|\[idx\]|\[index\]", line):
-                    return True
+        for line in rtl_lines[block_info["start_idx"] : block_info["end_idx"] + 1]:
+            # every index pattern starts with '['
+            if "[" in line and _RE_INDEX_VAR.search(line):
+                return True
         return False
 
     def _wrap_with_generate(self, blocks_info: Dict, rtl_lines: List[str]) -> List[str]:
         """Wrap collected orphan blocks into a generate/endgenerate region."""
         wrapped_lines: List[str] = []
         base_indent = self._get_indent(rtl_lines[blocks_info["start_idx"]])
+        genvar_line, generate_line, loop_end_line, endgenerate_line = _generate_frame(
+            base_indent
+        )
 
         if blocks_info["needs_genvar"]:
-            wrapped_lines.append(f"{base_indent}genvar I;\n")
+            wrapped_lines.append(genvar_line)
             self.missing_genvar_added += 1
 
-        wrapped_lines.append(f"{base_indent}generate\n")
+        wrapped_lines.append(generate_line)
 
         if blocks_info["needs_genvar"]:
             loop_range = self._infer_generate_loop_range(blocks_info, rtl_lines)
@@ -149,17 +200,18 @@ class GenerateBlockPatcher:
                     wrapped_lines.append(indented_line)
 
         if blocks_info["needs_genvar"]:
-            wrapped_lines.append(f"{base_indent}  end\n")
+            wrapped_lines.append(loop_end_line)
 
-        wrapped_lines.append(f"{base_indent}endgenerate\n")
+        wrapped_lines.append(endgenerate_line)
 
         return wrapped_lines
 
     def _infer_generate_loop_range(self, blocks_info: Dict, rtl_lines: List[str]) -> str:
         """Infer a loop bound for generate from parameter declarations, if any."""
         for line in rtl_lines[:100]:
-            line_clean = line.strip()
-            param_match = re.search(r"parameter\s+(\w+)\s*=\s*(\d+)", line_clean)
+            if "parameter" not in line:
+                continue
+            param_match = _RE_PARAMETER.search(line)
             if param_match:
                 param_name = param_match.group(1)
                 if any(
@@ -174,6 +226,11 @@ class GenerateBlockPatcher:
         """Return indentation prefix."""
         return line[: len(line) - len(line.lstrip())]
 
+    @property
+    def fix_count(self) -> int:
+        """Number of repairs made by the last run (wrapped blocks plus genvar declarations)."""
+        return self.orphan_blocks_fixed + self.missing_genvar_added
+
     def get_summary(self) -> str:
         """Return a human-readable summary of performed fixes."""
         summary_parts: List[str] = []
@@ -7,12 +7,37 @@ Repairs dangling else/else-if constructs while preserving nesting.
 import re
 from typing import List, Dict, Optional
 
+from .diagnostics import DiagnosticBuffer
+
+_RE_IF = re.compile(r"\bif\s*\(")
+_RE_ELSE_IF = re.compile(r"\belse\s+if\s*\(")
+_RE_ELSE_BARE = re.compile(r"\belse\s*$")
+_RE_ELSE_BEGIN = re.compile(r"\belse\s+begin")
+
+# A begin whose matching end is further than this (or missing) is treated as
+# malformed: the if block is assumed to end shortly after the begin instead.
+_IF_BLOCK_SEARCH_WINDOW = 2000
+_IF_BLOCK_FALLBACK_SPAN = 20
+
+# Line kinds produced by the pairing pre-scan.
+_KIND_SKIP = 0  # blank or comment-only
+_KIND_IF = 1
+_KIND_ELSE_IF = 2
+_KIND_ELSE = 3
+_KIND_OTHER = 4
+
+_MESSAGES = {
+    "converted_else_if": "   converted dangling 'else if' to 'if' (line {})",
+    "skipped_else": "   skipped dangling 'else' (line {})",
+}
+
 
 class IfElsePatcher:
     """Patcher for Verilog if/else control structures."""
 
-    def __init__(self):
+    def __init__(self, verbose: bool = True):
         self.fixed_count = 0
+        self.diagnostics = DiagnosticBuffer(_MESSAGES, verbose)
 
     def fix_if_else_statements(self, rtl_lines: List[str]) -> List[str]:
         """
@@ -24,14 +49,23 @@ class IfElsePatcher:
         3. Drop truly dangling bare `else` that has no matching `if`.
         """
         self.fixed_count = 0
+        self.diagnostics.clear()
+
+        # only else / else-if lines are ever rewritten
+        if not any("else" in line for line in rtl_lines):
+            return list(rtl_lines)
 
-        pairs = self._analyze_if_else_pairing(rtl_lines)
+        stripped = [line.strip() for line in rtl_lines]
+        indents = [len(line) - len(line.lstrip(" \t")) for line in rtl_lines]
+        pairs = self._analyze_if_else_pairing(rtl_lines, stripped, indents)
 
         fixed_lines: List[str] = []
         for i, line in enumerate(rtl_lines):
-            line_clean = line.strip()
+            line_clean = stripped[i]
 
-            if self._is_else_statement(line_clean) or self._is_else_if_statement(line_clean):
+            if "else" in line_clean and (
+                self._is_else_statement(line_clean) or self._is_else_if_statement(line_clean)
+            ):
                 if i in pairs and pairs[i]["has_matching_if"]:
                     fixed_lines.append(line)
                 else:
@@ -39,91 +73,118 @@ class IfElsePatcher:
                         fixed_line = self._convert_else_if_to_if(line)
                         fixed_lines.append(fixed_line)
                         self.fixed_count += 1
-                        print(f"   converted dangling 'else if' to 'if' (line {i+1})")
+                        self.diagnostics.add("converted_else_if", i + 1)
                     else:
-                        print(f"   skipped dangling 'else' (line {i+1})")
+                        self.diagnostics.add("skipped_else", i + 1)
                         continue
             else:
                 fixed_lines.append(line)
 
         if self.fixed_count > 0:
-            print(f"   If-else patch: fixed {self.fixed_count} statements")
+            self.diagnostics.flush(f"   If-else patch: fixed {self.fixed_count} statements")
+        else:
+            self.diagnostics.flush()
 
         return fixed_lines
 
-    def _analyze_if_else_pairing(self, rtl_lines: List[str]) -> Dict[int, Dict]:
+    def _analyze_if_else_pairing(
+        self,
+        rtl_lines: List[str],
+        stripped: List[str],
+        indents: List[int],
+    ) -> Dict[int, Dict]:
         """
         Analyze if/else pairing.
 
+        Each line is classified once up front; begin/end matching is resolved
+        in the same pre-scan so block ends never require re-scanning.
+        `stripped` and `indents` hold the per-line strip() result and
+        indentation width computed once by the caller.
+
         Returns a map:
             line_idx -> {'has_matching_if': bool, 'if_line': Optional[int]}
         """
+        kinds: List[int] = []
+        # block_close[j] is the index of the 'end' that closes a 'begin' on line j
+        block_close: List[int] = [-1] * len(rtl_lines)
+        open_begins: List[int] = []
+
+        for idx, line_clean in enumerate(stripped):
+            kinds.append(self._classify_line(line_clean))
+
+            if line_clean.endswith("begin"):
+                open_begins.append(idx)
+            elif line_clean.startswith("end") and open_begins:
+                block_close[open_begins.pop()] = idx
+
         pairs: Dict[int, Dict] = {}
         active_ifs: List[Dict] = []
 
-        i = 0
-        while i < len(rtl_lines):
-            line = rtl_lines[i]
-            line_clean = line.strip()
-            indent = len(self._get_indent(line))
-
-            if not line_clean or line_clean.startswith("//"):
-                i += 1
+        for i, kind in enumerate(kinds):
+            if kind == _KIND_SKIP:
                 continue
 
-            if self._is_if_statement(line_clean):
-                block_end = self._find_if_block_end(rtl_lines, i)
+            if kind == _KIND_IF:
                 active_ifs.append(
                     {
                         "line": i,
-                        "indent": indent,
-                        "block_end": block_end,
+                        "indent": indents[i],
+                        "block_end": self._find_if_block_end(rtl_lines, stripped, block_close, i),
                         "has_else": False,
                     }
                 )
-                i += 1
                 continue
 
-            if self._is_else_if_statement(line_clean):
-                matching_if = self._find_matching_if_for_else(active_ifs, indent, i)
+            if kind == _KIND_ELSE_IF:
+                matching_if = self._find_matching_if_for_else(active_ifs, indents[i], i)
 
                 if matching_if is not None:
                     pairs[i] = {"has_matching_if": True, "if_line": matching_if["line"]}
                     matching_if["has_else"] = True
 
-                    block_end = self._find_if_block_end(rtl_lines, i)
                     active_ifs.append(
                         {
                             "line": i,
-                            "indent": indent,
-                            "block_end": block_end,
+                            "indent": indents[i],
+                            "block_end": self._find_if_block_end(
+                                rtl_lines, stripped, block_close, i
+                            ),
                             "has_else": False,
                         }
                     )
                 else:
                     pairs[i] = {"has_matching_if": False, "if_line": None}
-
-                i += 1
                 continue
 
-            if self._is_else_statement(line_clean):
-                matching_if = self._find_matching_if_for_else(active_ifs, indent, i)
+            if kind == _KIND_ELSE:
+                matching_if = self._find_matching_if_for_else(active_ifs, indents[i], i)
 
                 if matching_if is not None:
                     pairs[i] = {"has_matching_if": True, "if_line": matching_if["line"]}
                     matching_if["has_else"] = True
                 else:
                     pairs[i] = {"has_matching_if": False, "if_line": None}
-
-                i += 1
                 continue
 
             active_ifs = [ctx for ctx in active_ifs if ctx["block_end"] >= i]
 
-            i += 1
-
         return pairs
 
+    def _classify_line(self, line_clean: str) -> int:
+        """Classify a stripped line for the pairing pass."""
+        if not line_clean or line_clean.startswith("//"):
+            return _KIND_SKIP
+        # Cheap keyword test before any regex work.
+        if "if" not in line_clean and "else" not in line_clean:
+            return _KIND_OTHER
+        if self._is_if_statement(line_clean):
+            return _KIND_IF
+        if self._is_else_if_statement(line_clean):
+            return _KIND_ELSE_IF
+        if self._is_else_statement(line_clean):
+            return _KIND_ELSE
+        return _KIND_OTHER
+
     def _find_matching_if_for_else(
         self,
         active_ifs: List[Dict],
@@ -144,79 +205,65 @@ class IfElsePatcher:
                         return if_ctx
         return None
 
-    def _find_if_block_end(self, rtl_lines: List[str], if_idx: int) -> int:
+    def _find_if_block_end(
+        self,
+        rtl_lines: List[str],
+        stripped: List[str],
+        block_close: List[int],
+        if_idx: int,
+    ) -> int:
         """
         Find end index of an if block (without the else part).
-        If there is a begin, find the matching end; otherwise find
-        the next line with a semicolon.
+        If there is a begin, use its pre-computed matching end (bounded by
+        _IF_BLOCK_SEARCH_WINDOW); otherwise find the next line with a semicolon.
         """
-        line = rtl_lines[if_idx].strip()
-
-        has_begin = False
-        search_start = if_idx + 1
-
-        for i in range(if_idx + 1, min(if_idx + 5, len(rtl_lines))):
-            check_line = rtl_lines[i].strip()
-            if check_line == "begin" or check_line.endswith("begin"):
-                has_begin = True
-                search_start = i
-                break
+        n = len(rtl_lines)
+
+        for i in range(if_idx + 1, min(if_idx + 5, n)):
+            check_line = stripped[i]
+            if check_line.endswith("begin"):
+                close_idx = block_close[i]
+                if close_idx == -1 or close_idx - i >= _IF_BLOCK_SEARCH_WINDOW:
+                    return min(i + _IF_BLOCK_FALLBACK_SPAN, n - 1)
+                return close_idx
             if check_line and not check_line.startswith("//"):
                 break
 
-        if has_begin:
-            depth = 1
-            for i in range(search_start + 1, len(rtl_lines)):
-                check_line = rtl_lines[i].strip()
-
-                if check_line == "begin" or check_line.endswith("begin"):
-                    depth += 1
-                elif check_line == "end" or check_line.startswith("end"):
-                    depth -= 1
-                    if depth == 0:
-                        return i
-
-            return len(rtl_lines) - 1
-
-        for i in range(if_idx + 1, min(if_idx + 10, len(rtl_lines))):
+        for i in range(if_idx + 1, min(if_idx + 10, n)):
             if ";" in rtl_lines[i]:
                 return i
 
-        return min(if_idx + 3, len(rtl_lines) - 1)
+        return min(if_idx + 3, n - 1)
 
     def _is_if_statement(self, line_clean: str) -> bool:
         """Detect if statements that are not else-if."""
-        if_pattern = r"\bif\s*\("
-        return bool(re.search(if_pattern, line_clean)) and not line_clean.startswith("else")
+        return _RE_IF.search(line_clean) is not None and not line_clean.startswith("else")
 
     def _is_else_if_statement(self, line_clean: str) -> bool:
         """Detect else-if statements."""
-        return bool(re.search(r"\belse\s+if\s*\(", line_clean))
+        return _RE_ELSE_IF.search(line_clean) is not None
 
     def _is_else_statement(self, line_clean: str) -> bool:
         """Detect bare else (not else-if)."""
         if "else if" in line_clean:
             return False
-
-        else_patterns = [
-            r"\belse\s*$",
-            r"\belse\s+begin",
-        ]
-        return any(re.search(pattern, line_clean) for pattern in else_patterns)
+        return (
+            _RE_ELSE_BARE.search(line_clean) is not None
+            or _RE_ELSE_BEGIN.search(line_clean) is not None
+        )
 
     def _convert_else_if_to_if(self, line: str) -> str:
         """Turn `else if` into a standalone `if`."""
-        return re.sub(r"\belse\s+if\s*\(", "if (", line)
+        return _RE_ELSE_IF.sub("if (", line)
 
     def _get_indent(self, line: str) -> str:
-        """Return indentation prefix for a line."""
-        indent = ""
-        for char in line:
-            if char in [" ", "\t"]:
-                indent += char
-            else:
-                break
-        return indent
+        """Return indentation prefix (leading spaces/tabs) for a line."""
+        return line[: len(line) - len(line.lstrip(" \t"))]
+
+    @property
+    def fix_count(self) -> int:
+        """Number of repairs made by the last run."""
+        return self.fixed_count
 
     def get_summary(self) -> str:
         """Return a human-readable summary of performed fixes."""
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Line classifier shared by the assign, case and generate patchers.
+Tags a stripped RTL line with bit flags. A LineTagCache memoizes the tags
+for one patching run: SyntaxErrorPatcher shares one with its sub-patchers,
+so lines that pass unchanged through several of them are only classified
+the first time, and the cache is emptied when the run returns.
+"""
+
+import re
+from functools import lru_cache, wraps
+from typing import Dict, List, Optional
+
+
+# Line tags (bit flags).
+ASSIGN_START = 1 << 0
+ORPHAN_TERNARY = 1 << 1
+INCOMPLETE_ASSIGNMENT = 1 << 2
+NEW_STATEMENT = 1 << 3
+CONTINUATION = 1 << 4
+CASE_OPEN = 1 << 5
+ENDCASE = 1 << 6
+CASE_TERMINATOR = 1 << 7
+CASE_BODY_STATEMENT = 1 << 8
+LABELED_BEGIN = 1 << 9
+BLOCK_STOP = 1 << 10
+
+_RE_CASE = re.compile(r"\bcase\s*\(")
+_RE_CASE_SET_LABEL = re.compile(r"\s*\{[^}]+\}\s*:\s*$")
+_RE_LABELED_BEGIN = re.compile(r"^\s*begin\s*:\s*(\w+)\s*$")
+
+# Last characters of an assignment missing its right-hand side ('=', '<=', '?', ':').
+_INCOMPLETE_ASSIGNMENT_CHARS = frozenset("=?:")
+# First characters of a line that only holds part of a ternary/operator chain.
+_ORPHAN_TERNARY_CHARS = frozenset("?:|&^")
+# First characters (plus '=='/'!=') of a line continuing the previous statement.
+_CONTINUATION_CHARS = frozenset("|&^+-?:")
+_CONTINUATION_PREFIXES = ("==", "!=")
+# Prefixes that mark the start of a new statement (assign merging).
+_NEW_STATEMENT_PREFIXES = (
+    "assign ", "always", "wire ", "reg ", "input ", "output ",
+    "module ", "endmodule", "begin", "end", "if ", "case ",
+)
+# Prefixes that likely mark the end of an open case block.
+_CASE_TERMINATOR_PREFIXES = (
+    "always", "assign", "wire ", "reg ", "input ", "output ",
+    "module ", "endmodule", "begin", "end", "if ", "else",
+)
+# Statements that terminate a labeled begin block being collected.
+_BLOCK_STOP_PREFIXES = ("endmodule", "module ", "always", "assign")
+
+
+def line_tags(line_clean: str) -> int:
+    """Return the tag bits for a stripped line."""
+    tags = 0
+
+    if line_clean.startswith("assign ") and "=" in line_clean:
+        tags |= ASSIGN_START
+    tail = line_clean.rstrip()
+    if tail and tail[-1] in _INCOMPLETE_ASSIGNMENT_CHARS:
+        tags |= INCOMPLETE_ASSIGNMENT
+    if line_clean.startswith(_NEW_STATEMENT_PREFIXES):
+        tags |= NEW_STATEMENT
+    if line_clean.startswith(_CASE_TERMINATOR_PREFIXES):
+        tags |= CASE_TERMINATOR
+    if line_clean.startswith("endcase"):
+        tags |= ENDCASE
+    if "case" in line_clean and _RE_CASE.search(line_clean):
+        tags |= CASE_OPEN
+    if _is_case_body_statement(line_clean):
+        tags |= CASE_BODY_STATEMENT
+
+    head = line_clean.lstrip()
+    if head:
+        if head[0] in _ORPHAN_TERNARY_CHARS:
+            tags |= ORPHAN_TERNARY
+        if head[0] in _CONTINUATION_CHARS or head.startswith(_CONTINUATION_PREFIXES):
+            tags |= CONTINUATION
+
+    if "begin" in line_clean and labeled_begin_name(line_clean) is not None:
+        tags |= LABELED_BEGIN
+    if line_clean.startswith(_BLOCK_STOP_PREFIXES) or (
+        # bare 'end' / 'end;'
+        line_clean.startswith("end") and line_clean[3:].lstrip() in ("", ";")
+    ):
+        tags |= BLOCK_STOP
+
+    return tags
+
+
+class LineTagCache:
+    """Per-run memo of line_tags(), keyed on stripped and on raw lines."""
+
+    __slots__ = ("_clean", "_raw")
+
+    def __init__(self) -> None:
+        self._clean: Dict[str, int] = {}
+        self._raw: Dict[str, int] = {}
+
+    def line_tags(self, line_clean: str) -> int:
+        """Return the tag bits for a stripped line."""
+        tags = self._clean.get(line_clean)
+        if tags is None:
+            tags = self._clean[line_clean] = line_tags(line_clean)
+        return tags
+
+    def raw_line_tags(self, line: str) -> int:
+        """
+        Return the tag bits for an unstripped line.
+
+        Keyed on the line as the patchers received it, so a hit costs one
+        (cached) string hash and no strip() allocation.
+        """
+        tags = self._raw.get(line)
+        if tags is None:
+            tags = self._raw[line] = self.line_tags(line.strip())
+        return tags
+
+    def clear(self) -> None:
+        """Drop every memoized line."""
+        self._clean.clear()
+        self._raw.clear()
+
+
+def clears_line_tags(method):
+    """
+    Decorate a patcher entry point so that, when the call returns, the
+    patcher's LineTagCache is cleared if the patcher owns it. A shared cache
+    is left to its owner, which clears it at the end of the whole run.
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            if self.owns_line_tags:
+                self.line_tag_cache.clear()
+    return wrapper
+
+
+@lru_cache(maxsize=4096)
+def labeled_begin_name(line_clean: str) -> Optional[str]:
+    """Return the label of a 'begin : label' line, or None."""
+    match = _RE_LABELED_BEGIN.match(line_clean)
+    return match.group(1) if match else None
+
+
+def join_lines(lines: List[str]) -> str:
+    """
+    Join patched lines into one string, ending every line with a newline.
+
+    Merged assigns and inserted endcase lines come back unterminated, so a
+    plain join would glue them to the following line.
+    """
+    return "".join(line if line.endswith("\n") else line + "\n" for line in lines)
+
+
+def _is_case_body_statement(line: str) -> bool:
+    """Decide whether a stripped case-body line holds an executable statement."""
+    if not line or line.startswith("//"):
+        return False
+
+    if line.startswith("default:") or (
+        line.lstrip().startswith("{") and _RE_CASE_SET_LABEL.match(line)
+    ):
+        return False
+
+    return "=" in line or any(keyword in line for keyword in ["begin", "if", "for", "while"])
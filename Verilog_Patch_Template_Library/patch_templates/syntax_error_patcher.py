@@ -4,6 +4,9 @@ Syntax error patcher.
 Coordinates the individual patchers for assign, case, if-else, always, and generate.
 """
 
+import logging
+import re
+from functools import lru_cache
 from typing import List
 
 from .case_statement_patcher import CaseStatementPatcher
@@ -11,19 +14,70 @@ from .if_else_patcher import IfElsePatcher
 from .always_block_patcher import AlwaysBlockPatcher
 from .assign_statement_patcher import AssignStatementPatcher
 from .generate_block_patcher import GenerateBlockPatcher
+from .line_classifier import LineTagCache, clears_line_tags, join_lines
+
+
+logger = logging.getLogger(__name__)
+
+# Operator and brace tokens that are dropped when they sit alone on a line.
+_ORPHAN_OPERATORS = frozenset("&|^~+-*/<>=!{}:?")
+# Whole-word keywords, so identifiers such as my_genvar_reg do not match.
+_RE_GENVAR = re.compile(r"\bgenvar\b")
+_RE_GENERATE = re.compile(r"\bgenerate\b")
+# How many emitted lines back an existing genvar still counts as a declaration.
+_GENVAR_LOOKBACK = 20
+
+
+def _leading_whitespace(line: str) -> str:
+    """Return the leading whitespace of a line."""
+    return line[: len(line) - len(line.lstrip())]
+
+
+def _is_obvious_orphan_operator(line_clean: str) -> bool:
+    """Detect stripped lines that contain only a single operator token."""
+    return len(line_clean) == 1 and line_clean in _ORPHAN_OPERATORS
+
+
+def _needs_genvar_declaration(line_clean: str, lines_since_genvar: int) -> bool:
+    """
+    Detect places where a missing 'genvar' declaration should be injected.
+
+    `lines_since_genvar` is the distance back to the last emitted line with
+    a genvar keyword; only one further back than the lookback window counts
+    as missing.
+    """
+    return (
+        lines_since_genvar > _GENVAR_LOOKBACK
+        and _RE_GENVAR.search(line_clean) is not None
+        and _RE_GENERATE.search(line_clean) is None
+    )
+
+
+@lru_cache(maxsize=256)
+def _genvar_line(indent: str) -> str:
+    """Return the injected genvar declaration for an indent."""
+    return f"{indent}genvar i;\n"
 
 
 class SyntaxErrorPatcher:
     """High-level orchestrator that applies all patchers in a fixed order."""
 
-    def __init__(self):
-        self.case_patcher = CaseStatementPatcher()
-        self.if_else_patcher = IfElsePatcher()
-        self.always_patcher = AlwaysBlockPatcher()
-        self.assign_patcher = AssignStatementPatcher()
-        self.generate_patcher = GenerateBlockPatcher()
+    def __init__(self, verbose: bool = True):
+        # verbose=False silences the sub-patchers' stdout diagnostics; the
+        # orchestrator's own progress lines always go to the module logger.
+        # One line-tag cache is shared by the classifying patchers for the
+        # length of a fix_all_syntax_errors call.
+        self.owns_line_tags = True
+        self.line_tag_cache = LineTagCache()
+        tags = self.line_tag_cache
+        self.case_patcher = CaseStatementPatcher(verbose=verbose, line_tag_cache=tags)
+        self.if_else_patcher = IfElsePatcher(verbose=verbose)
+        self.always_patcher = AlwaysBlockPatcher(verbose=verbose)
+        self.assign_patcher = AssignStatementPatcher(verbose=verbose, line_tag_cache=tags)
+        self.generate_patcher = GenerateBlockPatcher(verbose=verbose, line_tag_cache=tags)
         self.total_fixes = 0
 
+    @clears_line_tags
     def fix_all_syntax_errors(self, rtl_lines: List[str]) -> List[str]:
         """
         Run all patchers in sequence on the given RTL lines.
@@ -36,109 +90,116 @@ class SyntaxErrorPatcher:
           5) Generate-block wrapping.
           6) Final cleanup of obviously broken operator-only lines.
         """
-        print(f"Starting syntax patching, original lines: {len(rtl_lines)}")
+        logger.info("Starting syntax patching, original lines: %d", len(rtl_lines))
 
-        print("   Step 1: patch assign statements")
+        logger.debug("Step 1: patch assign statements")
         rtl_lines = self.assign_patcher.fix_assign_statements(rtl_lines)
-        self._update_stats(self.assign_patcher.get_summary())
+        self._update_stats(self.assign_patcher)
 
-        print("   Step 2: patch case statements")
+        logger.debug("Step 2: patch case statements")
         rtl_lines = self.case_patcher.fix_case_statements(rtl_lines)
-        self._update_stats(self.case_patcher.get_summary())
+        self._update_stats(self.case_patcher)
 
-        print("   Step 3: patch if-else statements")
+        logger.debug("Step 3: patch if-else statements")
         rtl_lines = self.if_else_patcher.fix_if_else_statements(rtl_lines)
-        self._update_stats(self.if_else_patcher.get_summary())
+        self._update_stats(self.if_else_patcher)
 
-        print("   Step 4: patch always blocks")
+        logger.debug("Step 4: patch always blocks")
         rtl_lines = self.always_patcher.fix_always_blocks(rtl_lines)
-        self._update_stats(self.always_patcher.get_summary())
+        self._update_stats(self.always_patcher)
 
-        print("   Step 5: patch generate blocks")
+        logger.debug("Step 5: patch generate blocks")
         rtl_lines = self.generate_patcher.fix_generate_blocks(rtl_lines)
-        self._update_stats(self.generate_patcher.get_summary())
+        self._update_stats(self.generate_patcher)
 
-        print("   Step 6: final cleanup")
+        logger.debug("Step 6: final cleanup")
         rtl_lines = self._conservative_cleanup(rtl_lines)
 
-        print(f"Syntax patching finished, final lines: {len(rtl_lines)}")
+        logger.info("Syntax patching finished, final lines: %d", len(rtl_lines))
         return rtl_lines
 
-    def _update_stats(self, summary: str) -> None:
-        """Accumulate statistics from sub-patchers by parsing their summaries."""
-        if summary and "fixed" in summary:
-            print(f"   {summary}")
-            import re
+    def fix_all_syntax_errors_str(self, text: str) -> str:
+        """
+        Run all patchers on RTL source text and return the patched text.
 
-            match = re.search(r"fixed\s*(\d+)", summary)
-            if match:
-                self.total_fixes += int(match.group(1))
+        The text is split once and joined once. Lines emitted by the patchers
+        without a trailing newline (merged assigns, inserted endcase) are
+        terminated so that every output line ends with one.
+        """
+        return join_lines(self.fix_all_syntax_errors(text.splitlines(keepends=True)))
+
+    def reset(self) -> None:
+        """
+        Zero the aggregate fix count, which accumulates across calls.
+
+        Lets one SyntaxErrorPatcher be reused across files in a batch run
+        instead of being rebuilt per file. The sub-patchers need no reset:
+        each of their fix_* entry points starts from zeroed counters.
+        """
+        self.total_fixes = 0
+
+    def _update_stats(self, patcher) -> None:
+        """Accumulate a sub-patcher's fix count and log its summary if it did anything."""
+        fix_count = patcher.fix_count
+        if fix_count:
+            logger.info("%s", patcher.get_summary())
+            self.total_fixes += fix_count
 
     def _conservative_cleanup(self, rtl_lines: List[str]) -> List[str]:
         """
         Final cleanup pass:
         - remove lines that are clearly just stray operators.
         - inject missing genvar declarations when needed.
+
+        When nothing was cleaned, `rtl_lines` itself is returned; the
+        pipeline only ever passes in a list produced by the previous step.
         """
+        # module-level helpers bound as locals for the per-line calls
+        is_orphan = _is_obvious_orphan_operator
+        needs_genvar = _needs_genvar_declaration
         cleaned_lines: List[str] = []
-        cleanup_count = 0
+        cleanup_count: int = 0
+        # index in cleaned_lines of the last emitted line with a genvar keyword
+        last_genvar_idx: int = -_GENVAR_LOOKBACK - 1
 
         for i, line in enumerate(rtl_lines):
-            line_clean = line.strip()
+            line_clean: str = line.strip()
 
-            if self._is_obvious_orphan_operator(line_clean):
+            if is_orphan(line_clean):
                 cleanup_count += 1
-                print(f"   removed orphan operator (line {i+1}): {line_clean[:20]}...")
+                logger.debug("removed orphan operator (line %d): %s...", i + 1, line_clean[:20])
                 continue
 
-            if self._needs_genvar_declaration(line_clean, cleaned_lines):
-                genvar_line = self._create_genvar_declaration(line)
-                cleaned_lines.append(genvar_line)
-                cleanup_count += 1
-                print(f"   inserted genvar declaration (line {len(cleaned_lines)})")
+            if "genvar" in line_clean and _RE_GENVAR.search(line_clean):
+                if needs_genvar(line_clean, len(cleaned_lines) - last_genvar_idx):
+                    cleaned_lines.append(self._create_genvar_declaration(line))
+                    cleanup_count += 1
+                    logger.debug("inserted genvar declaration (line %d)", len(cleaned_lines))
+                last_genvar_idx = len(cleaned_lines)
 
             cleaned_lines.append(line)
 
-        if cleanup_count > 0:
-            print(f"   Final cleanup: processed {cleanup_count} issues")
+        if cleanup_count == 0:
+            return rtl_lines
 
+        logger.info("Final cleanup: processed %d issues", cleanup_count)
         return cleaned_lines
 
     def _is_obvious_orphan_operator(self, line_clean: str) -> bool:
         """Detect lines that contain only a single operator token."""
-        if not line_clean:
-            return False
-
-        orphan_patterns = [
-            r"^\s*[&|^~]\s*$",
-            r"^\s*[+\-*/]\s*$",
-            r"^\s*[<>=!]\s*$",
-            r"^\s*[{}]\s*$",
-            r"^\s*:\s*$",
-            r"^\s*\?\s*$",
-        ]
-
-        import re as _re
-
-        return any(_re.match(pattern, line_clean) for pattern in orphan_patterns)
+        return _is_obvious_orphan_operator(line_clean)
 
-    def _needs_genvar_declaration(self, line_clean: str, previous_lines: List[str]) -> bool:
+    def _needs_genvar_declaration(self, line_clean: str, lines_since_genvar: int) -> bool:
         """Detect places where a missing 'genvar' declaration should be injected."""
-        if "genvar" in line_clean and "generate" not in line_clean:
-            for prev_line in previous_lines[-20:]:
-                if "genvar" in prev_line.strip():
-                    return False
-            return True
-        return False
+        return _needs_genvar_declaration(line_clean, lines_since_genvar)
 
     def _create_genvar_declaration(self, line: str) -> str:
         """Create a genvar declaration line aligned with the given context."""
-        indent = self._get_indent(line)
-        return f"{indent}genvar i;\n"
+        return _genvar_line(self._get_indent(line))
 
     def _get_indent(self, line: str) -> str:
         """Return indentation prefix of a line."""
-        return line[: len(line) - len(line.lstrip())]
+        return _leading_whitespace(line)
 
     def get_total_summary(self) -> str:
         """Return an aggregate summary across all patchers."""
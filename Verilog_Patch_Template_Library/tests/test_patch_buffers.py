@@ -0,0 +1,190 @@
+"""
+The *_to_buffer methods must return one newline-terminated line per
+patched line, even for lines the patchers build without a newline.
+The remaining cases pin down the single-pass rewrites of the individual
+patchers with small before/after inputs.
+
+Run from the repository root:
+
+    python -m unittest discover -s Verilog_Patch_Template_Library/tests
+"""
+
+from __future__ import annotations
+
+import pathlib
+import sys
+import unittest
+
+
+# Make the package importable when running from a cloned repository.
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[2]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from Verilog_Patch_Template_Library import (  # type: ignore  # noqa: E402
+    AssignStatementPatcher,
+    CaseStatementPatcher,
+    GenerateBlockPatcher,
+    IfElsePatcher,
+    SyntaxErrorPatcher,
+)
+
+
+MERGED_ASSIGN = [
+    "assign a = b assign c = d;\n",
+    "assign e = f;\n",
+]
+
+MISSING_ENDCASE = [
+    "always @(*) begin\n",
+    "  case (sel)\n",
+    "    2'b00: q = a;\n",
+    "end\n",
+]
+
+
+class ToBufferTest(unittest.TestCase):
+    def test_merged_assign_is_split_onto_separate_lines(self) -> None:
+        text = AssignStatementPatcher(verbose=False).fix_assign_statements_to_buffer(MERGED_ASSIGN)
+        self.assertEqual(text, "assign a = b;\nassign c = d;\nassign e = f;\n")
+
+    def test_inserted_endcase_ends_its_own_line(self) -> None:
+        text = CaseStatementPatcher(verbose=False).fix_case_statements_to_buffer(MISSING_ENDCASE)
+        self.assertEqual(
+            text,
+            "always @(*) begin\n  case (sel)\n    2'b00: q = a;\n  endcase\nend\n",
+        )
+
+    def test_generate_buffer_matches_line_output(self) -> None:
+        rtl = ["genvar i;\n", "for (i = 0; i < 4; i = i + 1) begin : g_loop\n", "  assign y[i] = x[i];\n", "end"]
+        patcher = GenerateBlockPatcher(verbose=False)
+        text = patcher.fix_generate_blocks_to_buffer(rtl)
+        self.assertTrue(text.endswith("\n"))
+        self.assertEqual(text.splitlines(), [line.rstrip("\n") for line in patcher.fix_generate_blocks(rtl)])
+
+    def test_buffers_agree_with_full_pipeline_string(self) -> None:
+        text = SyntaxErrorPatcher(verbose=False).fix_all_syntax_errors_str("".join(MERGED_ASSIGN + MISSING_ENDCASE))
+        self.assertIn("assign a = b;\nassign c = d;\n", text)
+        self.assertIn("  endcase\nend\n", text)
+
+
+def if_with_begin_block(body_lines: int, closed_by_end: bool) -> list:
+    """An 'if' whose begin sits on the next line, followed by an 'else if'."""
+    lines = ["if (a)\n", "begin\n"] + ["  x = 1;\n"] * body_lines
+    if closed_by_end:
+        lines.append("end\n")
+    return lines + ["else if (c)\n", "  y = 0;\n"]
+
+
+class IfElsePairingTest(unittest.TestCase):
+    def test_else_pairs_with_if_whose_block_closes_at_the_outer_end(self) -> None:
+        # the begin/end stack matches line 1's begin with the last end, not the first
+        rtl = [
+            "if (a)\n",
+            "begin\n",
+            "  if (b)\n",
+            "  begin\n",
+            "    x = 1;\n",
+            "  end\n",
+            "end\n",
+            "else\n",
+            "  x = 0;\n",
+        ]
+        patcher = IfElsePatcher(verbose=False)
+        self.assertEqual(patcher.fix_if_else_statements(rtl), rtl)
+        self.assertEqual(patcher.fix_count, 0)
+
+    def test_dangling_else_if_becomes_if_and_bare_else_is_dropped(self) -> None:
+        rtl = ["x = 1;\n", "else if (c)\n", "  x = 0;\n", "else\n", "  x = 3;\n"]
+        patcher = IfElsePatcher(verbose=False)
+        self.assertEqual(
+            patcher.fix_if_else_statements(rtl),
+            ["x = 1;\n", "if (c)\n", "  x = 0;\n", "  x = 3;\n"],
+        )
+        self.assertEqual(patcher.fix_count, 1)
+
+    def test_unmatched_begin_ends_block_after_fallback_span(self) -> None:
+        # no end: the block is taken to end 20 lines after the begin
+        patcher = IfElsePatcher(verbose=False)
+        inside = patcher.fix_if_else_statements(if_with_begin_block(20, closed_by_end=False))
+        self.assertEqual(inside[-2:], ["else if (c)\n", "  y = 0;\n"])
+        beyond = patcher.fix_if_else_statements(if_with_begin_block(21, closed_by_end=False))
+        self.assertEqual(beyond[-2:], ["if (c)\n", "  y = 0;\n"])
+
+    def test_end_outside_search_window_uses_fallback_span(self) -> None:
+        patcher = IfElsePatcher(verbose=False)
+        # end 1999 lines after the begin is still matched
+        near = patcher.fix_if_else_statements(if_with_begin_block(1998, closed_by_end=True))
+        self.assertEqual(near[-2:], ["else if (c)\n", "  y = 0;\n"])
+        # end 2000 lines after the begin is treated like a missing one
+        far = patcher.fix_if_else_statements(if_with_begin_block(1999, closed_by_end=True))
+        self.assertEqual(far[-2:], ["if (c)\n", "  y = 0;\n"])
+
+
+class EmptyCaseRemovalTest(unittest.TestCase):
+    def test_only_cases_without_statements_are_removed(self) -> None:
+        rtl = [
+            "always @(*) begin\n",
+            "  case (s)\n",
+            "    // nothing\n",
+            "    default: ;\n",
+            "  endcase\n",
+            "  case (t)\n",
+            "    1: q = a;\n",
+            "  endcase\n",
+            "  case (u)\n",
+            "  endcase\n",
+            "end\n",
+        ]
+        patcher = CaseStatementPatcher(verbose=False)
+        self.assertEqual(
+            patcher.fix_case_statements(rtl),
+            ["always @(*) begin\n", "  case (t)\n", "    1: q = a;\n", "  endcase\n", "end\n"],
+        )
+        self.assertEqual(patcher.removed_count, 2)
+
+    def test_case_without_endcase_is_kept(self) -> None:
+        rtl = ["  case (s)\n", "    default: ;\n"]
+        patcher = CaseStatementPatcher(verbose=False)
+        self.assertEqual(patcher.fix_case_statements(rtl)[:2], rtl)
+        self.assertEqual(patcher.removed_count, 0)
+
+
+class AssignNormalizeTest(unittest.TestCase):
+    def fix(self, line: str) -> str:
+        (fixed,) = AssignStatementPatcher(verbose=False).fix_assign_statements([line])
+        return fixed
+
+    def test_spacing_around_operators(self) -> None:
+        self.assertEqual(self.fix("assign  a=b ;\n"), "assign a = b ;")
+        self.assertEqual(self.fix("assign a = b==c ? d:e;\n"), "assign a = b == c ? d : e;")
+
+    def test_split_double_equals_is_fused(self) -> None:
+        self.assertEqual(self.fix("assign a = b = = c;\n"), "assign a = b == c;")
+
+    def test_nonblocking_arrow_keeps_its_historical_spacing(self) -> None:
+        # '<=' and '< =' both come out as '< ='
+        self.assertEqual(self.fix("assign a <= b;\n"), "assign a < = b;")
+        self.assertEqual(self.fix("assign a < = b;\n"), "assign a < = b;")
+
+
+class GenvarCleanupTest(unittest.TestCase):
+    PADDING = ["module m;\n"] + ["wire w;\n"] * 25
+
+    def cleanup(self, tail: list) -> list:
+        return SyntaxErrorPatcher(verbose=False)._conservative_cleanup(self.PADDING + tail)
+
+    def test_genvar_inside_identifier_is_not_a_declaration(self) -> None:
+        tail = ["  reg my_genvar_reg;\n", "  for (genvar k = 0; k < 4; k++) begin\n"]
+        self.assertEqual(
+            self.cleanup(tail)[-3:],
+            ["  reg my_genvar_reg;\n", "  genvar i;\n", "  for (genvar k = 0; k < 4; k++) begin\n"],
+        )
+
+    def test_identifier_containing_genvar_gets_no_declaration(self) -> None:
+        tail = ["  for (genvar_k = 0; genvar_k < 4; genvar_k++) begin\n"]
+        self.assertEqual(self.cleanup(tail), self.PADDING + tail)
+
+
+if __name__ == "__main__":
+    unittest.main()